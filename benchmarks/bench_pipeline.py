@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite for the Python Pipeline Scripts
+Generates synthetic research results JSON and Form 5500 / Schedule A CSVs, times each
+stage of process_data.py, generate_report.py and self_funded_classifier.py, records
+peak memory per stage, and compares the results against a stored baseline.
+
+Runs offline with the standard library only, e.g.:
+    python benchmarks/bench_pipeline.py --companies 5000 --csv-rows 1000000 --output bench.json
+    python benchmarks/bench_pipeline.py --baseline benchmarks/baseline.json
+"""
+
+import csv
+import gc
+import importlib.util
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Callable, Optional, Tuple
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import process_data
+import generate_report
+from insurance_records import record_to_json
+
+
+CLASSIFIER_PATH = REPO_ROOT / "docs" / "completed" / "self_funded_classifier.py"
+FORM5500_LAYOUT = REPO_ROOT / "tests" / "data" / "f_5500_latest_layout.txt"
+SCHEDULE_A_LAYOUT = REPO_ROOT / "tests" / "data" / "SCH_A_layout.txt"
+
+# Columns the classifier reads, used when the DOL layout files are not available
+FORM5500_COLUMNS = [
+    "ACK_ID", "FORM_PLAN_YEAR_BEGIN_DATE", "FORM_TAX_PRD", "PLAN_NAME", "SPONS_DFE_PN", "SPONSOR_DFE_NAME",
+    "SPONS_DFE_EIN", "TYPE_WELFARE_BNFT_CODE", "FUNDING_INSURANCE_IND", "FUNDING_GEN_ASSET_IND",
+    "BENEFIT_INSURANCE_IND", "BENEFIT_GEN_ASSET_IND", "SCH_A_ATTACHED_IND", "NUM_SCH_A_ATTACHED_CNT"
+]
+SCHEDULE_A_COLUMNS = [
+    "ACK_ID", "SCH_A_PLAN_YEAR_BEGIN_DATE", "SCH_A_PLAN_YEAR_END_DATE", "SCH_A_PLAN_NUM", "SCH_A_EIN",
+    "WLFR_BNFT_HEALTH_IND", "WLFR_BNFT_STOP_LOSS_IND"
+]
+
+BENEFIT_TYPES = ["HEALTH", "DENTAL", "VISION", "LIFE", "STOP LOSS", "Standard Benefits", "TELEHEALTH"]
+STAGES = ["load", "process", "dump", "render", "index_build", "index_open", "classify"]
+
+# Sponsor name planted in the synthetic headers CSV for the classify stage
+TARGET_COMPANY = "Benchmark Target Holdings"
+
+
+def load_classifier():
+    """Import self_funded_classifier.py, which lives outside any package"""
+    spec = importlib.util.spec_from_file_location("self_funded_classifier", CLASSIFIER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def read_layout_columns(layout_file: Path, fallback: List[str]) -> List[str]:
+    """Column names from a DOL layout file (FIELD_POSITION,FIELD_NAME,...), or the fallback list"""
+    if not layout_file.exists():
+        return fallback
+    columns = []
+    with open(layout_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.strip().split(",")
+            if len(parts) >= 2 and parts[0].isdigit():
+                columns.append(parts[1])
+    return columns or fallback
+
+
+def generate_research_results(companies: int, years: List[str], plans_per_year: int, seed: int = 0) -> Dict[str, Any]:
+    """
+    Build a synthetic *_research_results.json document
+    """
+    rng = random.Random(seed)
+    carriers = [f"SYNTHETIC CARRIER {i} INSURANCE COMPANY" for i in range(200)]
+
+    result_companies = []
+    for i in range(companies):
+        company_years = [year for year in years if rng.random() > 0.2] or years[-1:]
+        details = {
+            year: [
+                {
+                    "benefitType": rng.choice(BENEFIT_TYPES),
+                    "carrierName": rng.choice(carriers),
+                    "totalCharges": f"{rng.randint(0, 500_000_000) / 100:.2f}",
+                    "personsCovered": str(rng.randint(0, 5000)),
+                    "brokerCommission": f"{rng.randint(0, 5_000_000) / 100:.2f}"
+                }
+                for _ in range(plans_per_year)
+            ]
+            for year in company_years
+        }
+        records = {
+            year: [{
+                "ein": f"{100000000 + i:09d}",
+                "year": int(year),
+                "plan_name": f"SYNTHETIC COMPANY {i} WELFARE PLAN",
+                "sponsor_name": f"SYNTHETIC COMPANY {i}",
+                "has_schedule_a": True,
+                "active_participants": rng.randint(0, 5000)
+            }]
+            for year in company_years
+        }
+        result_companies.append({
+            "ein": f"{100000000 + i:09d}",
+            "companyName": f"Synthetic Company {i}",
+            "form5500": {"years": company_years, "records": records, "recordCount": len(records)},
+            "scheduleA": {"error": None, "details": details}
+        })
+
+    return {
+        "success": True,
+        "summary": {"totalCompanies": companies},
+        "companies": result_companies,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+
+def write_form5500_csv(path: Path, rows: int, year: int, seed: int = 0) -> None:
+    """
+    Write a synthetic Form 5500 headers CSV with the full DOL column layout.
+    Every 10,000th row is sponsored by TARGET_COMPANY.
+    """
+    rng = random.Random(seed)
+    columns = read_layout_columns(FORM5500_LAYOUT, FORM5500_COLUMNS)
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for i in range(rows):
+            health = rng.random() < 0.4
+            insured = rng.random() < 0.6
+            values = {
+                "ACK_ID": f"{year}{i:016d}",
+                "FORM_PLAN_YEAR_BEGIN_DATE": f"{year}-01-01",
+                "FORM_TAX_PRD": f"{year}-12-31",
+                "PLAN_NAME": f"SYNTHETIC SPONSOR {i} EMPLOYEE BENEFIT PLAN",
+                "SPONS_DFE_PN": "501",
+                "SPONSOR_DFE_NAME": TARGET_COMPANY.upper() if i % 10_000 == 0 else f"SYNTHETIC SPONSOR {i} LLC",
+                "SPONS_DFE_EIN": f"{100000000 + i:09d}",
+                "TYPE_WELFARE_BNFT_CODE": "4A4B4D" if health else "4B4D",
+                "FUNDING_INSURANCE_IND": "1" if insured else "",
+                "FUNDING_GEN_ASSET_IND": "" if insured else "1",
+                "BENEFIT_INSURANCE_IND": "1" if insured else "",
+                "BENEFIT_GEN_ASSET_IND": "" if insured else "1",
+                "SCH_A_ATTACHED_IND": "1" if insured else "0",
+                "NUM_SCH_A_ATTACHED_CNT": str(rng.randint(1, 4)) if insured else "0"
+            }
+            writer.writerow([values.get(column, "") for column in columns])
+
+
+def write_schedule_a_csv(path: Path, rows: int, year: int, seed: int = 0) -> None:
+    """
+    Write a synthetic Schedule A CSV whose EIN/plan numbers line up with write_form5500_csv
+    """
+    rng = random.Random(seed + 1)
+    columns = read_layout_columns(SCHEDULE_A_LAYOUT, SCHEDULE_A_COLUMNS)
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for i in range(rows):
+            values = {
+                "ACK_ID": f"{year}{i:016d}",
+                "SCH_A_PLAN_YEAR_BEGIN_DATE": f"{year}-01-01",
+                "SCH_A_PLAN_YEAR_END_DATE": f"{year}-12-31",
+                "SCH_A_PLAN_NUM": "501",
+                "SCH_A_EIN": f"{100000000 + rng.randrange(rows):09d}",
+                "WLFR_BNFT_HEALTH_IND": "1" if rng.random() < 0.3 else "",
+                "WLFR_BNFT_STOP_LOSS_IND": "1" if rng.random() < 0.1 else ""
+            }
+            writer.writerow([values.get(column, "") for column in columns])
+
+
+def measure(func: Callable[[], Any], repeats: int = 1, trace_memory: bool = True) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Time func (best of repeats) and, optionally, record its peak traced memory in a separate run
+    """
+    timings = []
+    result = None
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+
+    stats = {"seconds": round(min(timings), 6), "runs": [round(t, 6) for t in timings]}
+
+    if trace_memory:
+        # tracemalloc slows allocation-heavy code down, so memory gets its own run
+        result = None
+        gc.collect()
+        tracemalloc.start()
+        result = func()
+        stats["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result, stats
+
+
+def run_benchmarks(workdir: Path, companies: int, years: List[str], plans_per_year: int, csv_rows: int,
+                   repeats: int = 1, trace_memory: bool = True, seed: int = 0) -> Dict[str, Any]:
+    """
+    Generate the synthetic inputs in workdir and time every pipeline stage
+    """
+    classifier = load_classifier()
+    csv_year = int(years[-1])
+
+    research_file = workdir / "synthetic_research_results.json"
+    processed_file = workdir / "synthetic_processed.json"
+    report_file = workdir / "synthetic_report.html"
+    headers_file = workdir / f"f_5500_{csv_year}_latest.csv"
+    schedule_a_file = workdir / f"F_SCH_A_{csv_year}_latest.csv"
+
+    setup_start = time.perf_counter()
+    with open(research_file, 'w', encoding='utf-8') as f:
+        json.dump(generate_research_results(companies, years, plans_per_year, seed), f)
+    if csv_rows:
+        write_form5500_csv(headers_file, csv_rows, csv_year, seed)
+        write_schedule_a_csv(schedule_a_file, csv_rows, csv_year, seed)
+    setup_seconds = time.perf_counter() - setup_start
+
+    stages = {}
+
+    def load():
+        with open(research_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    raw_data, stages["load"] = measure(load, repeats, trace_memory)
+    processed_data, stages["process"] = measure(
+        lambda: process_data.build_processed_data(raw_data, "Synthetic"), repeats, trace_memory)
+
+    def dump():
+        with open(processed_file, 'w', encoding='utf-8') as f:
+            json.dump(processed_data, f, indent=2, ensure_ascii=False, default=record_to_json)
+
+    _, stages["dump"] = measure(dump, repeats, trace_memory)
+
+    def render():
+        with open(report_file, 'w', encoding='utf-8') as f:
+            f.write(generate_report.generate_html_report(processed_data))
+
+    _, stages["render"] = measure(render, repeats, trace_memory)
+
+    if csv_rows:
+        indexes, stages["index_build"] = measure(
+            lambda: classifier.build_schedA_index(str(schedule_a_file)), repeats, trace_memory)
+        # The first call writes the on-disk index; the timed calls only open it
+        classifier.load_schedA_index(str(schedule_a_file))
+        _, stages["index_open"] = measure(
+            lambda: classifier.load_schedA_index(str(schedule_a_file)), repeats, trace_memory)
+        plans, stages["classify"] = measure(
+            lambda: classifier.find_company_plans(str(headers_file), TARGET_COMPANY, *indexes),
+            repeats, trace_memory)
+        stages["classify"]["plans_found"] = len(plans)
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "parameters": {
+                "companies": companies,
+                "years": years,
+                "plans_per_year": plans_per_year,
+                "csv_rows": csv_rows,
+                "repeats": repeats,
+                "seed": seed
+            },
+            "setup_seconds": round(setup_seconds, 3),
+            "sizes": {
+                "research_results_bytes": research_file.stat().st_size,
+                "processed_bytes": processed_file.stat().st_size,
+                "report_bytes": report_file.stat().st_size
+            }
+        },
+        "stages": stages
+    }
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Per-stage comparison against a baseline run; a stage regresses when it is
+    more than tolerance (fractional) slower or uses that much more peak memory
+    """
+    comparisons = []
+    for stage in STAGES:
+        current = results["stages"].get(stage)
+        previous = baseline.get("stages", {}).get(stage)
+        if not current or not previous:
+            continue
+
+        comparison = {"stage": stage, "time_ratio": current["seconds"] / previous["seconds"] if previous["seconds"] else None}
+        if current.get("peak_bytes") and previous.get("peak_bytes"):
+            comparison["memory_ratio"] = current["peak_bytes"] / previous["peak_bytes"]
+        comparison["regressed"] = any(
+            ratio is not None and ratio > 1 + tolerance
+            for ratio in (comparison["time_ratio"], comparison.get("memory_ratio"))
+        )
+        comparisons.append(comparison)
+
+    return comparisons
+
+
+def print_results(results: Dict[str, Any], comparisons: Optional[List[Dict[str, Any]]] = None) -> None:
+    by_stage = {comparison["stage"]: comparison for comparison in comparisons or []}
+    print(f"{'stage':<12} {'seconds':>10} {'peak MB':>10} {'vs baseline':>14}")
+    for stage in STAGES:
+        stats = results["stages"].get(stage)
+        if not stats:
+            continue
+        peak = f"{stats['peak_bytes'] / 1e6:.1f}" if "peak_bytes" in stats else "-"
+        versus = ""
+        if stage in by_stage and by_stage[stage]["time_ratio"] is not None:
+            versus = f"{by_stage[stage]['time_ratio']:.2f}x" + (" REGRESSED" if by_stage[stage]["regressed"] else "")
+        print(f"{stage:<12} {stats['seconds']:>10.4f} {peak:>10} {versus:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Python pipeline scripts on synthetic data")
+    parser.add_argument("--companies", type=int, default=2000, help="Companies in the synthetic research results")
+    parser.add_argument("--years", default="2021,2022,2023", help="Comma-separated plan years per company")
+    parser.add_argument("--plans-per-year", type=int, default=8, help="Schedule A plans per company per year")
+    parser.add_argument("--csv-rows", type=int, default=200_000,
+                        help="Rows in each synthetic Form 5500 / Schedule A CSV (0 skips the classifier stages)")
+    parser.add_argument("--repeats", type=int, default=1, help="Timed runs per stage (best is reported)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Keep generated inputs and outputs here instead of a temp directory")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a previous results file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed fractional slowdown/memory growth before a stage counts as regressed")
+
+    args = parser.parse_args()
+    years = [year.strip() for year in args.years.split(",") if year.strip()]
+
+    with tempfile.TemporaryDirectory(prefix="pe-bench-") as temp_dir:
+        workdir = Path(args.workdir or temp_dir)
+        workdir.mkdir(parents=True, exist_ok=True)
+        results = run_benchmarks(workdir, args.companies, years, args.plans_per_year, args.csv_rows,
+                                 repeats=args.repeats, trace_memory=not args.no_memory, seed=args.seed)
+
+    comparisons = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparisons = compare_to_baseline(results, baseline, args.tolerance)
+        results["baseline"] = {"file": args.baseline, "tolerance": args.tolerance, "stages": comparisons}
+
+    print_results(results, comparisons)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.output}")
+
+    if comparisons and any(comparison["regressed"] for comparison in comparisons):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
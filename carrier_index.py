@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Cross-Portfolio Carrier Index
+Persistent inverted index from insurance carriers to the portfolio companies,
+firms and years whose processed outputs list them, with top-N premium rankings
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+from generate_report import PAGE_MANIFEST_SUFFIX, REPORT_MANIFEST_NAME, load_processed_data
+from insurance_records import BINARY_EXTENSION, ProcessedCompany
+from pipeline_profiling import PROFILE_SIDECAR_SUFFIX
+from process_data import BATCH_MANIFEST_NAME
+
+
+DEFAULT_INDEX_FILE = "carrier_index.db"
+
+# Files that live next to processed outputs but are not processed outputs
+_IGNORED_SUFFIXES = (PROFILE_SIDECAR_SUFFIX, PAGE_MANIFEST_SUFFIX, BATCH_MANIFEST_NAME, REPORT_MANIFEST_NAME)
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_carrier(name: Optional[str]) -> str:
+    """Case- and punctuation-insensitive key for a carrier name ("Aetna Life Ins. Co." -> "aetna life ins co")"""
+    return _NON_ALNUM.sub(" ", (name or "").casefold()).strip()
+
+
+def find_processed_files(sources: List[str]) -> List[str]:
+    """
+    Resolve directories (every .json, .ndjson and binary file inside) and glob patterns to processed files
+    """
+    files = set()
+    for source in sources:
+        if Path(source).is_dir():
+            candidates = [str(path) for pattern in ("*.json", "*.ndjson", f"*{BINARY_EXTENSION}")
+                          for path in Path(source).glob(pattern)]
+        else:
+            candidates = glob.glob(source)
+        files.update(str(Path(path).resolve()) for path in candidates if not path.endswith(_IGNORED_SUFFIXES))
+    return sorted(files)
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_processed_companies(path: str) -> Tuple[str, Iterator[ProcessedCompany]]:
+    """
+    Firm name and companies of one processed output (JSON, NDJSON or the binary format).
+    Raises ValueError for files that are not processed outputs (e.g. raw research results).
+    """
+    try:
+        if path.endswith(".ndjson"):
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = [json.loads(line) for line in f if line.strip()]
+            if not lines or "summary" not in lines[-1]:
+                raise ValueError("NDJSON file has no trailing summary line")
+            return lines[-1]["firm_name"], iter([ProcessedCompany.from_dict(company) for company in lines[:-1]])
+
+        processed_data = load_processed_data(path)
+        return processed_data["firm_name"], iter(processed_data["companies"])
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Not a processed output: {e}")
+
+
+class CarrierIndex:
+    """
+    SQLite inverted index of processed outputs: one posting per (file, company, plan)
+    keyed by the normalized carrier name. Files are tracked by size, mtime and
+    content hash so update() only re-reads outputs that changed.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_FILE):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, firm_name TEXT, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "sha256 TEXT NOT NULL, indexed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "carrier_key TEXT NOT NULL, carrier_name TEXT NOT NULL, benefit_type TEXT, "
+            "firm_name TEXT NOT NULL, company_name TEXT NOT NULL, data_year TEXT, "
+            "premiums REAL NOT NULL, brokerage_fees REAL NOT NULL, people_covered INTEGER NOT NULL, "
+            "path TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS postings_carrier ON postings (carrier_key, premiums)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS postings_path ON postings (path)")
+
+    def update(self, sources: List[str], prune: bool = True) -> Dict[str, Any]:
+        """
+        Bring the index up to date with the processed outputs under sources.
+        Unchanged files are skipped; changed files have their postings replaced.
+        With prune, indexed files that no longer exist are dropped.
+        Returns counts of indexed, unchanged, removed and skipped files.
+        """
+        stats = {"indexed": 0, "unchanged": 0, "removed": 0, "skipped": []}
+        known = {row[0]: row[1:] for row in self._conn.execute("SELECT path, size, mtime_ns, sha256 FROM files")}
+
+        for path in find_processed_files(sources):
+            stat = Path(path).stat()
+            previous = known.get(path)
+            if previous and previous[0] == stat.st_size and previous[1] == stat.st_mtime_ns:
+                stats["unchanged"] += 1
+                continue
+
+            digest = _file_digest(path)
+            if previous and previous[2] == digest:
+                # Touched but not modified
+                self._conn.execute("UPDATE files SET mtime_ns = ? WHERE path = ?", (stat.st_mtime_ns, path))
+                stats["unchanged"] += 1
+                continue
+
+            try:
+                firm_name, companies = iter_processed_companies(path)
+                postings = [
+                    (normalize_carrier(plan.carrier_name), plan.carrier_name or "", plan.benefit_type, firm_name,
+                     company.company_name, company.data_year, plan.premiums, plan.brokerage_fees,
+                     plan.people_covered, path)
+                    for company in companies
+                    for plan in company.plans
+                ]
+            except (ValueError, OSError) as e:
+                if previous:
+                    # Replaced by something unreadable: its old postings no longer describe the file
+                    self.remove(path)
+                stats["skipped"].append({"path": path, "error": str(e)})
+                continue
+
+            with self._conn:
+                self._conn.execute("DELETE FROM postings WHERE path = ?", (path,))
+                self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", postings)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, firm_name, stat.st_size, stat.st_mtime_ns, digest, time.time())
+                )
+            stats["indexed"] += 1
+
+        if prune:
+            for path in known:
+                if not Path(path).exists():
+                    self.remove(path)
+                    stats["removed"] += 1
+
+        self._conn.commit()
+        return stats
+
+    def remove(self, path: str) -> None:
+        """Drop one processed output from the index"""
+        path = str(Path(path).resolve())
+        with self._conn:
+            self._conn.execute("DELETE FROM postings WHERE path = ?", (path,))
+            self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def lookup(self, carrier: str, benefit_type: Optional[str] = None, substring: bool = False,
+               limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Companies whose plans use carrier, largest premiums first, with their
+        matching plans summed into one row per company and year. Matches the
+        normalized carrier name exactly, or anywhere within it with substring.
+        """
+        key = normalize_carrier(carrier)
+        if substring:
+            where, params = "carrier_key LIKE ? ESCAPE '\\'", ["%" + re.sub(r"([%_\\])", r"\\\1", key) + "%"]
+        else:
+            where, params = "carrier_key = ?", [key]
+        if benefit_type:
+            where += " AND benefit_type = ?"
+            params.append(benefit_type)
+
+        sql = (
+            "SELECT MAX(carrier_name), GROUP_CONCAT(benefit_type, char(31)), firm_name, company_name, data_year, "
+            "SUM(premiums), SUM(brokerage_fees), SUM(people_covered), COUNT(*) "
+            f"FROM postings WHERE {where} GROUP BY firm_name, company_name, data_year "
+            "ORDER BY SUM(premiums) DESC, firm_name, company_name"
+        )
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        return [
+            {
+                "carrier_name": carrier_name,
+                "benefit_types": sorted(set(benefit_types.split("\x1f"))) if benefit_types else [],
+                "firm_name": firm_name,
+                "company_name": company_name,
+                "data_year": data_year,
+                "premiums": round(premiums, 2),
+                "brokerage_fees": round(brokerage_fees, 2),
+                "people_covered": people_covered,
+                "plans": plans
+            }
+            for carrier_name, benefit_types, firm_name, company_name, data_year, premiums, brokerage_fees,
+            people_covered, plans in self._conn.execute(sql, params)
+        ]
+
+    def top_carriers(self, limit: int = 10, benefit_type: Optional[str] = None,
+                     firm_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Carriers ranked by total premiums across every indexed firm (or one firm)"""
+        where, params = [], []
+        if benefit_type:
+            where.append("benefit_type = ?")
+            params.append(benefit_type)
+        if firm_name:
+            where.append("firm_name = ?")
+            params.append(firm_name)
+
+        sql = (
+            "SELECT carrier_key, MAX(carrier_name), SUM(premiums), SUM(brokerage_fees), SUM(people_covered), "
+            "COUNT(DISTINCT firm_name || char(0) || company_name), COUNT(DISTINCT firm_name) FROM postings"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + " GROUP BY carrier_key ORDER BY SUM(premiums) DESC LIMIT ?"
+        )
+        params.append(limit)
+
+        return [
+            {
+                "carrier_name": carrier_name,
+                "total_premiums": round(premiums, 2),
+                "total_brokerage_fees": round(brokerage_fees, 2),
+                "total_people_covered": people_covered,
+                "companies": companies,
+                "firms": firms
+            }
+            for _, carrier_name, premiums, brokerage_fees, people_covered, companies, firms
+            in self._conn.execute(sql, params)
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        """Number of indexed files, postings and distinct carriers"""
+        files = self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        postings, carriers = self._conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT carrier_key) FROM postings"
+        ).fetchone()
+        return {"files": files, "postings": postings, "carriers": carriers}
+
+    def close(self) -> None:
+        self._conn.commit()
+        self._conn.close()
+
+    def __enter__(self) -> "CarrierIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def format_currency(amount: float) -> str:
+    """Format currency with commas and dollar sign"""
+    return f"${amount:,.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query a carrier index over processed PE firm outputs")
+    parser.add_argument("--index", default=DEFAULT_INDEX_FILE, help="SQLite index file")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Index (or re-index changed) processed outputs")
+    build.add_argument("sources", nargs="+", help="Directories or glob patterns of processed JSON/NDJSON/binary files")
+    build.add_argument("--no-prune", action="store_true", help="Keep entries for files that no longer exist")
+
+    query = commands.add_parser("query", help="Companies using a carrier, largest premiums first")
+    query.add_argument("carrier", help="Carrier name (normalized before matching)")
+    query.add_argument("--substring", action="store_true", help="Match the name anywhere in the carrier name")
+    query.add_argument("--benefit-type", help="Only plans with this benefit type")
+    query.add_argument("--limit", type=int, help="Return at most this many companies")
+
+    top = commands.add_parser("top", help="Carriers ranked by total premiums")
+    top.add_argument("--limit", type=int, default=10, help="Number of carriers to show")
+    top.add_argument("--benefit-type", help="Only plans with this benefit type")
+    top.add_argument("--firm-name", help="Only this firm's companies")
+
+    args = parser.parse_args()
+
+    try:
+        with CarrierIndex(args.index) as index:
+            start = time.perf_counter()
+            if args.command == "build":
+                result = index.update(args.sources, prune=not args.no_prune)
+                result.update(index.stats())
+            elif args.command == "query":
+                result = index.lookup(args.carrier, args.benefit_type, args.substring, args.limit)
+            else:
+                result = index.top_carriers(args.limit, args.benefit_type, args.firm_name)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+    except sqlite3.Error as e:
+        print(f"Error: Could not use index '{args.index}': {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
+
+    if args.command == "build":
+        print(f"Indexed {result['indexed']} files, {result['unchanged']} unchanged, {result['removed']} removed")
+        for skipped in result["skipped"]:
+            print(f"Skipped {skipped['path']}: {skipped['error']}", file=sys.stderr)
+        print(f"Index holds {result['carriers']} carriers across {result['files']} files "
+              f"({result['postings']} plans) in {args.index}")
+    elif args.command == "query":
+        if not result:
+            print(f"No companies found for carrier '{args.carrier}'")
+        for row in result:
+            print(f"{format_currency(row['premiums']):>16}  {row['firm_name']} / {row['company_name']} "
+                  f"({row['data_year']}) - {', '.join(row['benefit_types'])} - {row['carrier_name']}")
+    else:
+        for rank, row in enumerate(result, 1):
+            print(f"{rank:>3}. {row['carrier_name']}: {format_currency(row['total_premiums'])} premiums, "
+                  f"{row['companies']} companies in {row['firms']} firms")
+    print(f"({elapsed_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,17 @@
 #!/usr/bin/env python3
 import csv
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import sys
 import argparse
-from collections import defaultdict
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from bisect import bisect_left
+from collections import defaultdict, deque
 
 TRUTHY = {"1","Y","y","TRUE","True","true"}
 
@@ -14,36 +24,278 @@ def norm(s):
 def has_health_4A(type_welfare_benefit_code: str) -> bool:
     return "4A" in (type_welfare_benefit_code or "")
 
-def build_schedA_index(sched_a_path: str):
-    idx_by_begin = defaultdict(lambda: {"health": False, "stop": False})
-    idx_by_end   = defaultdict(lambda: {"health": False, "stop": False})
-
-    with open(sched_a_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            ein = (r.get("SCH_A_EIN") or "").strip()
-            pn  = (r.get("SCH_A_PLAN_NUM") or "").strip()
-            by  = (r.get("SCH_A_PLAN_YEAR_BEGIN_DATE") or "").strip()
-            ey  = (r.get("SCH_A_PLAN_YEAR_END_DATE") or "").strip()
-            if not ein or not pn:
-                continue
-
-            begin_year = by[:4] if len(by) >= 4 else ""
-            end_year   = ey[:4] if len(ey) >= 4 else ""
-
-            h = is_true(r.get("WLFR_BNFT_HEALTH_IND", ""))
-            s = is_true(r.get("WLFR_BNFT_STOP_LOSS_IND", ""))
-
-            if begin_year:
-                keyb = (ein, pn, begin_year)
-                if h: idx_by_begin[keyb]["health"] = True
-                if s: idx_by_begin[keyb]["stop"]   = True
-            if end_year:
-                keye = (ein, pn, end_year)
-                if h: idx_by_end[keye]["health"] = True
-                if s: idx_by_end[keye]["stop"]   = True
+def quote_open(record, quote='"', delimiter=','):
+    # True when record (str, or bytes with bytes quote/delimiter) ends inside a quoted
+    # field, as csv's default dialect reads it: a quote opens a field only at its start,
+    # "" inside one is an escaped quote, and a bare quote within an unquoted field is text
+    in_quotes = False
+    i = record.find(quote)
+    while i != -1:
+        if in_quotes:
+            if record.startswith(quote, i + 1):
+                i += 1
+            else:
+                in_quotes = False
+        elif i == 0 or record[i - 1:i] == delimiter:
+            in_quotes = True
+        i = record.find(quote, i + 1)
+    return in_quotes
+
+# The only columns the classifier reads from each DOL file
+SCHEDULE_A_FIELDS = ("SCH_A_EIN", "SCH_A_PLAN_NUM", "SCH_A_PLAN_YEAR_BEGIN_DATE", "SCH_A_PLAN_YEAR_END_DATE",
+                     "WLFR_BNFT_HEALTH_IND", "WLFR_BNFT_STOP_LOSS_IND")
+HEADER_FIELDS = ("SPONSOR_DFE_NAME", "SPONS_DFE_EIN", "SPONS_DFE_PN", "PLAN_NAME", "TYPE_WELFARE_BNFT_CODE",
+                 "FORM_PLAN_YEAR_BEGIN_DATE", "FORM_TAX_PRD", "BENEFIT_INSURANCE_IND", "BENEFIT_GEN_ASSET_IND",
+                 "FUNDING_INSURANCE_IND", "FUNDING_GEN_ASSET_IND", "SCH_A_ATTACHED_IND", "NUM_SCH_A_ATTACHED_CNT")
+
+class ProjectedCSV:
+    # Reads only the given columns of a DOL CSV as tuples (None for a column the file
+    # lacks or a short row), instead of DictReader's dict of every column. Records
+    # without quotes are split directly, only as far as the last needed column;
+    # quoted ones (which may span lines) go through csv. A prefilter sees each raw
+    # record first, so rows that cannot match are skipped before any splitting.
+    def __init__(self, path, fields):
+        self.path = path
+        self.fields = fields
+        with open(path, newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), [])
+        # Like DictReader, a repeated column name resolves to its last occurrence
+        last = {name: i for i, name in enumerate(header)}
+        self.positions = [last.get(name) for name in fields]
+        self.present = [(i, name) for i, name in enumerate(fields) if last.get(name) is not None]
+        self.max_position = max((p for p in self.positions if p is not None), default=0)
+
+    def project(self, record):
+        if '"' in record:
+            values = next(csv.reader([record]), [])
+        else:
+            values = record.rstrip("\r\n").split(",", self.max_position + 1)
+            if values == [""]:
+                values = []
+        if not values:
+            return None
+        n = len(values)
+        return tuple(values[p] if p is not None and p < n else None for p in self.positions)
+
+    def as_dict(self, row):
+        # The DictReader view of a projected row, for classify_plan
+        return {name: row[i] for i, name in self.present}
+
+    def rows(self, prefilter=None):
+        with open(self.path, newline="", encoding="utf-8") as f:
+            next(f, None)
+            pending = None
+            for line in f:
+                if pending is not None:
+                    line = pending + line
+                    pending = None
+                if '"' in line and quote_open(line):
+                    pending = line
+                    continue
+                if prefilter is not None and not prefilter(line):
+                    continue
+                row = self.project(line)
+                if row is not None:
+                    yield row
+            if pending is not None and (prefilter is None or prefilter(pending)):
+                row = self.project(pending)
+                if row is not None:
+                    yield row
+
+    def rows_at(self, offsets):
+        # The records starting at the given byte offsets, in file order
+        with open(self.path, "rb") as f:
+            for offset in sorted(offsets):
+                f.seek(offset)
+                row = self.project(next(iter_csv_records(f))[1].decode("utf-8"))
+                if row is not None:
+                    yield row
+
+# Schedule A flags: begin-year and end-year health/stop-loss bits merged into one
+# index. Keys (ein, pn, year) of ASCII digits (ein up to 9, pn up to 3, year exactly
+# 4; lengths kept so "0123" and "123" stay distinct) pack into one int64, held in a
+# sorted array beside a byte of flags each; anything else goes to a small dict
+FLAG_HEALTH = 1
+FLAG_STOP = 2
+BEGIN_SHIFT = 0
+END_SHIFT = 2
+
+def pack_key(ein, pn, year):
+    if (len(ein) <= 9 and len(pn) <= 3 and len(year) == 4 and ein.isascii() and pn.isascii() and year.isascii()
+            and ein.isdigit() and pn.isdigit() and year.isdigit()):
+        return ((len(ein) * 1000000000 + int(ein)) * 4000 + len(pn) * 1000 + int(pn)) * 10000 + int(year)
+    return None
+
+class SchedAFlagIndex:
+    def __init__(self, keys, flags, extra):
+        self.keys = keys
+        self.flags = flags
+        self.extra = extra
+        self.size = len(keys)
+
+    @classmethod
+    def from_packed(cls, packed, extra):
+        # packed: key << 4 | flag bits, one entry per row and year; merge duplicate keys
+        keys = array("q")
+        flags = bytearray()
+        last = None
+        for value in sorted(packed):
+            key = value >> 4
+            if key == last:
+                flags[-1] |= value & 15
+            else:
+                keys.append(key)
+                flags.append(value & 15)
+                last = key
+        return cls(keys, bytes(flags), dict(extra))
+
+    def bits(self, key):
+        packed = pack_key(*key)
+        if packed is None:
+            return self.extra.get(key, 0)
+        i = bisect_left(self.keys, packed)
+        if i < self.size and self.keys[i] == packed:
+            return self.flags[i]
+        return 0
+
+    def views(self):
+        return SchedAFlagView(self, BEGIN_SHIFT), SchedAFlagView(self, END_SHIFT)
+
+class SchedAFlagView:
+    # The begin-year or end-year half of a SchedAFlagIndex, with the old dict-of-flags get()
+    def __init__(self, index, shift):
+        self.index = index
+        self.shift = shift
+
+    def __len__(self):
+        return (sum(1 for f in self.index.flags if f >> self.shift & 3)
+                + sum(1 for f in self.index.extra.values() if f >> self.shift & 3))
+
+    def get(self, key, default=None):
+        bits = self.index.bits(key) >> self.shift & 3
+        if not bits:
+            return default
+        return {"health": bool(bits & FLAG_HEALTH), "stop": bool(bits & FLAG_STOP)}
 
-    return idx_by_begin, idx_by_end
+def build_schedA_index(sched_a_path: str):
+    packed = array("q")
+    extra = defaultdict(int)
+
+    def add(ein, pn, year, bits):
+        key = pack_key(ein, pn, year)
+        if key is None:
+            extra[(ein, pn, year)] |= bits
+        else:
+            packed.append(key << 4 | bits)
+
+    for ein, pn, by, ey, health, stop in ProjectedCSV(sched_a_path, SCHEDULE_A_FIELDS).rows():
+        ein = (ein or "").strip()
+        pn  = (pn or "").strip()
+        by  = (by or "").strip()
+        ey  = (ey or "").strip()
+        if not ein or not pn:
+            continue
+
+        begin_year = by[:4] if len(by) >= 4 else ""
+        end_year   = ey[:4] if len(ey) >= 4 else ""
+
+        h = is_true(health or "")
+        s = is_true(stop or "")
+        bits = (FLAG_HEALTH if h else 0) | (FLAG_STOP if s else 0)
+        if not bits:
+            continue
+
+        if begin_year:
+            add(ein, pn, begin_year, bits << BEGIN_SHIFT)
+        if end_year:
+            add(ein, pn, end_year, bits << END_SHIFT)
+
+    return SchedAFlagIndex.from_packed(packed, extra).views()
+
+# On-disk Schedule A index: header, the sorted int64 keys, their flag bytes and the
+# non-packable keys as JSON, opened through mmap without copying the arrays
+INDEX_MAGIC = b"SAIDX002"
+INDEX_HEADER = struct.Struct("<8sQQ32sQQ")
+INDEX_SUFFIX = ".saidx"
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+def write_schedA_index(index_path, index, size, mtime_ns, digest):
+    keys = array("q", index.keys)
+    if sys.byteorder != "little":
+        keys.byteswap()
+    extra = json.dumps([[*key, bits] for key, bits in index.extra.items()]).encode("utf-8")
+    tmp_path = f"{index_path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, size, mtime_ns, digest, index.size, len(extra)))
+        f.write(keys.tobytes())
+        f.write(index.flags)
+        f.write(extra)
+    os.replace(tmp_path, index_path)
+
+def open_schedA_index(index_path, size, mtime_ns, sched_a_path):
+    # Returns a SchedAFlagIndex over the mapped file, or None when it is missing, corrupt or stale
+    try:
+        f = open(index_path, "rb")
+    except OSError:
+        return None
+    with f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return None
+    if len(mm) < INDEX_HEADER.size:
+        mm.close()
+        return None
+    header = INDEX_HEADER.unpack_from(mm, 0)
+    magic, isize, imtime, digest, count, extra_size = header
+    if magic != INDEX_MAGIC or isize != size or len(mm) != INDEX_HEADER.size + count * 9 + extra_size:
+        mm.close()
+        return None
+    if imtime != mtime_ns:
+        # Touched but maybe not changed: trust the index only if the content hash still matches
+        if file_sha256(sched_a_path) != digest:
+            mm.close()
+            return None
+        try:
+            with open(index_path, "r+b") as f:
+                f.write(INDEX_HEADER.pack(magic, isize, mtime_ns, digest, count, extra_size))
+        except OSError:
+            pass  # read-only index: still valid, the hash is just checked again next run
+    keys_end = INDEX_HEADER.size + count * 8
+    try:
+        extra = {tuple(entry[:3]): entry[3] for entry in json.loads(mm[keys_end + count:].decode("utf-8") or "[]")}
+    except (ValueError, TypeError, IndexError):
+        mm.close()
+        return None
+    if sys.byteorder == "little":
+        keys = memoryview(mm)[INDEX_HEADER.size:keys_end].cast("q")
+    else:
+        keys = array("q", mm[INDEX_HEADER.size:keys_end])
+        keys.byteswap()
+    flags = memoryview(mm)[keys_end:keys_end + count]
+    return SchedAFlagIndex(keys, flags, extra)
+
+def load_schedA_index(sched_a_path, index_path=None, rebuild=False):
+    index_path = index_path or sched_a_path + INDEX_SUFFIX
+    stat = os.stat(sched_a_path)
+    if not rebuild:
+        index = open_schedA_index(index_path, stat.st_size, stat.st_mtime_ns, sched_a_path)
+        if index is not None:
+            return index.views()
+    index = build_schedA_index(sched_a_path)[0].index
+    try:
+        write_schedA_index(index_path, index, stat.st_size, stat.st_mtime_ns, file_sha256(sched_a_path))
+    except OSError:
+        # Read-only location: answer this run from memory
+        return index.views()
+    mapped = open_schedA_index(index_path, stat.st_size, stat.st_mtime_ns, sched_a_path)
+    return (mapped or index).views()
 
 def classify_plan(header_row, sa_begin_idx, sa_end_idx):
     reasons = []
@@ -106,87 +358,553 @@ def classify_plan(header_row, sa_begin_idx, sa_end_idx):
     reasons.append("No Sched A and no clear arrangement flags")
     return ("Likely self-funded (absence of health Schedule A)", reasons, {"ein": ein, "plan_number": pn, "plan_year_begin": fby, "plan_year_end": fte})
 
+def evaluate_plan_row(r, sa_begin_idx, sa_end_idx, year=None, debug=False):
+    sponsor = r.get("SPONSOR_DFE_NAME","")
+    if year is not None:
+        by = (r.get("FORM_PLAN_YEAR_BEGIN_DATE") or "")[:4]
+        ey = (r.get("FORM_TAX_PRD") or "")[:4]
+        ok = (by.isdigit() and int(by)==year) or (ey.isdigit() and int(ey)==year)
+        if not ok:
+            if debug:
+                print(f"[SKIP-YEAR] {sponsor} BY={by} EY={ey} != {year}")
+            return None
+
+    has4a = has_health_4A(r.get("TYPE_WELFARE_BNFT_CODE",""))
+    ein   = (r.get("SPONS_DFE_EIN") or "").strip()
+    pnum  = (r.get("SPONS_DFE_PN") or "").strip()
+    by    = (r.get("FORM_PLAN_YEAR_BEGIN_DATE") or "")[:4]
+    ey    = (r.get("FORM_TAX_PRD") or "")[:4]
+
+    sa_h = False
+    if ein and pnum:
+        bflags = sa_begin_idx.get((ein, pnum, by), {})
+        eflags = sa_end_idx.get((ein, pnum, ey), {})
+        sa_h = (bflags.get("health", False) or eflags.get("health", False))
+        if debug:
+            print(f"[SAIDX] {sponsor} PN={pnum} BY={by} EY={ey} -> {bflags},{eflags}")
+
+    if not (has4a or sa_h):
+        if debug:
+            print(f"[SKIP] {sponsor} PN={pnum} BY={by} EY={ey} no 4A or SA health")
+        return None
+
+    classification, reasons, meta = classify_plan(r, sa_begin_idx, sa_end_idx)
+    return {
+        "plan_name": r.get("PLAN_NAME",""),
+        "plan_number": meta["plan_number"],
+        "ein": meta["ein"],
+        "plan_year_begin": meta["plan_year_begin"],
+        "plan_year_end": meta["plan_year_end"],
+        "classification": classification,
+        "reasons": reasons,
+    }
+
+def iter_header_rows(headers_path, name_index=None, offsets=None, prefilter=None):
+    # (reader, projected HEADER_FIELDS rows): every row of the headers CSV, or with a name
+    # index only the rows at offsets; callers re-check every row, so a dense offset set
+    # falls back to one sequential scan, which is faster than seeking row by row
+    reader = ProjectedCSV(headers_path, HEADER_FIELDS)
+    if name_index is not None and len(offsets) <= name_index.row_count * NAME_INDEX_SCAN_FRACTION:
+        return reader, reader.rows_at(offsets)
+    return reader, reader.rows(prefilter)
+
+def substring_prefilter(company_q):
+    # A raw-line check that every row whose norm()'d sponsor contains company_q passes
+    # (quotes are doubled inside quoted fields, so a needle with one cannot be checked raw)
+    if not company_q or '"' in company_q:
+        return None
+    return lambda line: company_q in line.lower()
+
+def find_company_plans(headers_path, company, sa_begin_idx, sa_end_idx, exact=False, year=None, debug=False,
+                       name_index=None, fuzzy=None):
+    company_q = norm(company)
+    plans = []
+
+    offsets = None
+    if name_index is not None:
+        if fuzzy is not None:
+            names, offsets = name_index.fuzzy(company_q, fuzzy)
+        else:
+            names, offsets = name_index.lookup(company_q, exact)
+    elif fuzzy is not None:
+        raise ValueError("fuzzy matching needs the sponsor name index")
+
+    prefilter = substring_prefilter(company_q) if fuzzy is None else None
+    reader, rows = iter_header_rows(headers_path, name_index, offsets, prefilter)
+    for row in rows:
+        sponsor = row[0]
+        if fuzzy is not None:
+            if norm(sponsor) not in names:
+                continue
+        elif exact:
+            if norm(sponsor) != company_q:
+                continue
+        else:
+            if company_q not in norm(sponsor):
+                continue
+
+        plan = evaluate_plan_row(reader.as_dict(row), sa_begin_idx, sa_end_idx, year, debug)
+        if plan is not None:
+            plans.append(plan)
+
+    return plans
+
+class CompanyMatcher:
+    # Matches one sponsor name against many company queries at once: exact queries
+    # through a dict, substring queries through an Aho-Corasick automaton, so the
+    # cost per row is one pass over the name whatever the number of queries
+    def __init__(self, queries):
+        self.exact = defaultdict(list)
+        self.always = []
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for i, (company, exact) in enumerate(queries):
+            q = norm(company)
+            if exact:
+                self.exact[q].append(i)
+            elif not q:
+                self.always.append(i)
+            else:
+                node = 0
+                for ch in q:
+                    nxt = self.goto[node].get(ch)
+                    if nxt is None:
+                        nxt = len(self.goto)
+                        self.goto.append({})
+                        self.fail.append(0)
+                        self.out.append([])
+                        self.goto[node][ch] = nxt
+                    node = nxt
+                self.out[node].append(i)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def matches(self, sponsor):
+        name = norm(sponsor)
+        found = set(self.always)
+        found.update(self.exact.get(name, ()))
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for ch in name:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+def find_portfolio_plans(headers_path, queries, sa_begin_idx, sa_end_idx, year=None, debug=False, name_index=None):
+    # queries: [(company, exact)]; one scan of the headers CSV (or one read of the rows the
+    # name index finds for any query), plans listed per query
+    matcher = CompanyMatcher(queries)
+    plans = [[] for _ in queries]
+
+    offsets = None
+    if name_index is not None:
+        offsets = set()
+        for company, exact in queries:
+            offsets.update(name_index.lookup(norm(company), exact)[1])
+
+    reader, rows = iter_header_rows(headers_path, name_index, offsets)
+    for row in rows:
+        found = matcher.matches(row[0])
+        if not found:
+            continue
+
+        plan = evaluate_plan_row(reader.as_dict(row), sa_begin_idx, sa_end_idx, year, debug)
+        if plan is not None:
+            for i in sorted(found):
+                plans[i].append(plan)
+
+    return plans
+
+def read_company_queries(names, path=None, exact=False):
+    # A leading "=" on a name (or companies-file line) forces an exact match for it
+    lines = list(names or [])
+    if path:
+        with open(path, encoding="utf-8") as f:
+            lines.extend(line.strip() for line in f)
+    queries = []
+    for line in lines:
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("="):
+            queries.append((line[1:].strip(), True))
+        else:
+            queries.append((line, exact))
+    return queries
+
+# Sponsor name index: norm()'d SPONSOR_DFE_NAME values with the byte offsets of
+# their rows in the headers CSV and the trigrams of each name, in SQLite, so a
+# query reads only the rows whose sponsor can match
+NAME_INDEX_SUFFIX = ".names.db"
+NAME_INDEX_VERSION = 1
+FUZZY_THRESHOLD = 0.5
+# Past this share of all rows, seeking row by row is slower than one sequential scan
+NAME_INDEX_SCAN_FRACTION = 0.2
+
+def trigrams(name):
+    return {name[i:i + 3] for i in range(len(name) - 2)}
+
+def iter_csv_records(f):
+    # (offset, raw record) for each record of a binary CSV file; a quoted field may span lines
+    offset = f.tell()
+    record = b""
+    for line in f:
+        record += line
+        if b'"' in record and quote_open(record, b'"', b','):
+            continue
+        yield offset, record
+        offset += len(record)
+        record = b""
+    if record:
+        yield offset, record
+
+class SponsorNameIndex:
+    def __init__(self, conn, headers_path):
+        self.conn = conn
+        self.headers_path = headers_path
+        self.row_count = conn.execute("SELECT value FROM meta WHERE key = 'rows'").fetchone()[0]
+
+    @classmethod
+    def open(cls, headers_path, index_path=None, rebuild=False):
+        index_path = index_path or headers_path + NAME_INDEX_SUFFIX
+        stat = os.stat(headers_path)
+        if not rebuild and os.path.exists(index_path):
+            conn = sqlite3.connect(index_path)
+            try:
+                meta = dict(conn.execute("SELECT key, value FROM meta"))
+            except sqlite3.DatabaseError:
+                meta = {}
+            if meta.get("version") == NAME_INDEX_VERSION and meta.get("size") == stat.st_size:
+                if meta.get("mtime_ns") == stat.st_mtime_ns:
+                    return cls(conn, headers_path)
+                # Touched but maybe not changed: keep the index if the content hash still matches
+                if meta.get("sha256") == file_sha256(headers_path).hex():
+                    with conn:
+                        conn.execute("UPDATE meta SET value = ? WHERE key = 'mtime_ns'", (stat.st_mtime_ns,))
+                    return cls(conn, headers_path)
+            conn.close()
+        cls.build(headers_path, index_path, stat)
+        return cls(sqlite3.connect(index_path), headers_path)
+
+    @staticmethod
+    def build(headers_path, index_path, stat):
+        tmp_path = f"{index_path}.tmp{os.getpid()}"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        try:
+            SponsorNameIndex._fill(conn, headers_path, stat)
+        except BaseException:
+            conn.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        conn.close()
+        os.replace(tmp_path, index_path)
+
+    @staticmethod
+    def _fill(conn, headers_path, stat):
+        conn.executescript("""
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value);
+            CREATE TABLE names (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, gram_count INTEGER NOT NULL);
+            CREATE TABLE rows (name_id INTEGER NOT NULL, offset INTEGER NOT NULL);
+            CREATE TABLE grams (gram TEXT NOT NULL, name_id INTEGER NOT NULL, PRIMARY KEY (gram, name_id)) WITHOUT ROWID;
+        """)
+        name_ids = {}
+        rows = []
+        with open(headers_path, "rb") as f:
+            records = iter_csv_records(f)
+            _, header = next(records, (0, b""))
+            fieldnames = next(csv.reader([header.decode("utf-8")]), [])
+            col = fieldnames.index("SPONSOR_DFE_NAME") if "SPONSOR_DFE_NAME" in fieldnames else None
+            for offset, record in records:
+                text = record.decode("utf-8")
+                if b'"' in record:
+                    fields = next(csv.reader([text]), [])
+                else:
+                    fields = text.rstrip("\r\n").split(",")
+                if not fields or fields == [""]:
+                    continue
+                name = norm(fields[col]) if col is not None and col < len(fields) else ""
+                name_id = name_ids.get(name)
+                if name_id is None:
+                    name_id = name_ids[name] = len(name_ids) + 1
+                rows.append((name_id, offset))
+        conn.executemany("INSERT INTO names VALUES (?, ?, ?)",
+                         ((name_id, name, len(trigrams(name))) for name, name_id in name_ids.items()))
+        conn.executemany("INSERT INTO rows VALUES (?, ?)", rows)
+        conn.executemany("INSERT INTO grams VALUES (?, ?)",
+                         ((gram, name_id) for name, name_id in name_ids.items() for gram in trigrams(name)))
+        conn.execute("CREATE INDEX rows_name ON rows (name_id)")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("version", NAME_INDEX_VERSION), ("size", stat.st_size), ("mtime_ns", stat.st_mtime_ns),
+            ("sha256", file_sha256(headers_path).hex()), ("rows", len(rows)),
+        ])
+        conn.commit()
+
+    def _offsets(self, name_ids):
+        if len(name_ids) > 500:
+            # One pass over the rows table beats many IN (...) batches
+            return [offset for name_id, offset in self.conn.execute("SELECT name_id, offset FROM rows")
+                    if name_id in name_ids]
+        return [row[0] for row in self.conn.execute(
+            f"SELECT offset FROM rows WHERE name_id IN ({','.join('?' * len(name_ids))})", list(name_ids))]
+
+    def lookup(self, company_q, exact=False):
+        # (matching names, row offsets) for an exact or substring query on a norm()'d name
+        if exact:
+            found = {name_id: name for name_id, name in
+                     self.conn.execute("SELECT id, name FROM names WHERE name = ?", (company_q,))}
+        else:
+            grams = trigrams(company_q)
+            if grams:
+                candidates = self.conn.execute(
+                    f"SELECT n.id, n.name FROM names n JOIN (SELECT name_id FROM grams WHERE gram IN "
+                    f"({','.join('?' * len(grams))}) GROUP BY name_id HAVING COUNT(*) = ?) g ON g.name_id = n.id",
+                    (*grams, len(grams)))
+            else:
+                # Too short for a trigram: check every distinct name (still no CSV parsing)
+                candidates = self.conn.execute("SELECT id, name FROM names")
+            found = {name_id: name for name_id, name in candidates if company_q in name}
+        return set(found.values()), self._offsets(found)
+
+    def fuzzy(self, company_q, threshold=FUZZY_THRESHOLD):
+        # Names whose trigram Dice similarity to the query is at least threshold
+        grams = trigrams(company_q)
+        if not grams:
+            return self.lookup(company_q, exact=True)
+        found = {}
+        for name_id, name, gram_count, shared in self.conn.execute(
+                f"SELECT n.id, n.name, n.gram_count, g.shared FROM names n JOIN (SELECT name_id, COUNT(*) AS shared "
+                f"FROM grams WHERE gram IN ({','.join('?' * len(grams))}) GROUP BY name_id) g ON g.name_id = n.id",
+                tuple(grams)):
+            if 2 * shared / (len(grams) + gram_count) >= threshold:
+                found[name_id] = name
+        return set(found.values()), self._offsets(found)
+
+    def close(self):
+        self.conn.close()
+
+def open_name_index(headers_path, index_path=None, rebuild=False):
+    # None when the index cannot be built or opened (e.g. a read-only CSV directory);
+    # callers then fall back to scanning the whole headers CSV
+    try:
+        return SponsorNameIndex.open(headers_path, index_path, rebuild)
+    except (sqlite3.Error, OSError):
+        return None
+
+def overall_classification(plans):
+    classes = [p["classification"] for p in plans]
+    if any(c.startswith("Self-funded") or c.startswith("Likely self-funded") for c in classes):
+        return "Self-funded (at least one plan)"
+    elif all(c=="Insured" or c.startswith("Likely insured") for c in classes):
+        return "Insured"
+    else:
+        return "Mixed/Indeterminate"
+
+# Multi-year mode: each year's headers/Schedule A pair is indexed and classified in
+# its own worker process, and the results are returned as a per-year timeline
+DEFAULT_HEADERS_PATTERN = "f_5500_{year}_latest.csv"
+DEFAULT_SCHEDA_PATTERN = "F_SCH_A_{year}_latest.csv"
+
+def parse_years(values):
+    # "2019-2024", "2019 2021" or a mix of both; a range must run oldest first
+    years = set()
+    for value in values:
+        for part in value.split(","):
+            first, _, last = part.strip().partition("-")
+            first, last = int(first), int(last or first)
+            if last < first:
+                raise ValueError(f"year range {part.strip()} runs backwards")
+            years.update(range(first, last + 1))
+    return sorted(years)
+
+def classify_year(year, headers_path, scheda_path, queries, use_index=True, rebuild=False, debug=False):
+    entry = {"year": year, "headers": headers_path, "scheda": scheda_path}
+    try:
+        if use_index:
+            sa_begin_idx, sa_end_idx = load_schedA_index(scheda_path, rebuild=rebuild)
+            name_index = open_name_index(headers_path, rebuild=rebuild)
+        else:
+            sa_begin_idx, sa_end_idx = build_schedA_index(scheda_path)
+            name_index = None
+        entry["results"] = find_portfolio_plans(headers_path, queries, sa_begin_idx, sa_end_idx,
+                                                year=year, debug=debug, name_index=name_index)
+        if name_index is not None:
+            name_index.close()
+    except (OSError, ValueError, csv.Error, sqlite3.Error) as e:
+        entry["error"] = f"{type(e).__name__}: {e}"
+    return entry
+
+def classify_years(years, queries, headers_pattern=DEFAULT_HEADERS_PATTERN, scheda_pattern=DEFAULT_SCHEDA_PATTERN,
+                   workers=None, use_index=True, rebuild=False, debug=False):
+    jobs = [(year, headers_pattern.format(year=year), scheda_pattern.format(year=year)) for year in years]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    if workers == 1:
+        entries = [classify_year(year, headers, scheda, queries, use_index, rebuild, debug)
+                   for year, headers, scheda in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(classify_year, year, headers, scheda, queries, use_index, rebuild, debug)
+                       for year, headers, scheda in jobs]
+            entries = []
+            for (year, headers, scheda), future in zip(jobs, futures):
+                try:
+                    entries.append(future.result())
+                except Exception as e:
+                    # The worker process itself died
+                    entries.append({"year": year, "headers": headers, "scheda": scheda,
+                                    "error": f"{type(e).__name__}: {e}"})
+
+    companies = []
+    for i, (company, exact) in enumerate(queries):
+        timeline = []
+        for entry in entries:
+            if "error" in entry:
+                timeline.append({"year": entry["year"], "error": entry["error"]})
+                continue
+            plans = entry["results"][i]
+            timeline.append({
+                "year": entry["year"],
+                "overall": overall_classification(plans) if plans else None,
+                "plans": plans,
+            })
+        companies.append({"company": company, "exact": exact, "timeline": timeline})
+
+    return {
+        "years": [{key: entry[key] for key in ("year", "headers", "scheda", "error") if key in entry}
+                  for entry in entries],
+        "workers": workers,
+        "companies": companies,
+    }
+
 def main():
     ap = argparse.ArgumentParser(description="Classify whether a company's medical plans are self-funded using Form 5500 + Schedule A CSVs.")
     ap.add_argument("--headers", default="f_5500_2024_latest.csv")
     ap.add_argument("--scheda",  default="F_SCH_A_2024_latest.csv")
-    ap.add_argument("--company", required=True)
+    ap.add_argument("--company")
+    ap.add_argument("--companies", nargs="+", help="Classify several companies in one pass over --headers")
+    ap.add_argument("--companies-file", help="File of company names, one per line (\"=Name\" for an exact match)")
+    ap.add_argument("--output", help="With --companies/--companies-file or --years, write the JSON here instead of stdout")
     ap.add_argument("--exact", action="store_true")
     ap.add_argument("--year", type=int, default=None)
+    ap.add_argument("--years", nargs="+", help="Classify across several years, e.g. 2019-2024, one worker per year")
+    ap.add_argument("--workers", type=int, default=None, help="Worker processes for --years (defaults to the CPU count)")
     ap.add_argument("--debug", action="store_true")
+    ap.add_argument("--index", default=None, help=f"Schedule A index file (default: <scheda>{INDEX_SUFFIX})")
+    ap.add_argument("--rebuild-index", action="store_true")
+    ap.add_argument("--name-index", default=None, help=f"Sponsor name index file (default: <headers>{NAME_INDEX_SUFFIX})")
+    ap.add_argument("--fuzzy", type=float, nargs="?", const=FUZZY_THRESHOLD, default=None,
+                    help=f"Match sponsor names by trigram similarity of at least this much (default {FUZZY_THRESHOLD})")
+    ap.add_argument("--no-index", action="store_true", help="Read the CSVs without the on-disk indexes")
     args = ap.parse_args()
 
+    batch = bool(args.companies or args.companies_file)
+    if batch == bool(args.company):
+        ap.error("give either --company or --companies/--companies-file")
+
+    if args.years:
+        if args.year or args.fuzzy is not None or args.index or args.name_index:
+            ap.error("--years cannot be combined with --year, --fuzzy, --index or --name-index")
+        try:
+            years = parse_years(args.years)
+        except ValueError:
+            ap.error("--years takes years or ranges such as 2019-2024 (oldest year first)")
+        headers_pattern = DEFAULT_HEADERS_PATTERN if args.headers == "f_5500_2024_latest.csv" else args.headers
+        scheda_pattern = DEFAULT_SCHEDA_PATTERN if args.scheda == "F_SCH_A_2024_latest.csv" else args.scheda
+        if "{year}" not in headers_pattern or "{year}" not in scheda_pattern:
+            ap.error("with --years, --headers and --scheda must contain {year}")
+
+        queries = read_company_queries(args.companies, args.companies_file, args.exact) if batch \
+            else [(args.company, args.exact)]
+        output = classify_years(years, queries, headers_pattern, scheda_pattern, args.workers,
+                                use_index=not args.no_index, rebuild=args.rebuild_index, debug=args.debug)
+
+        if batch or args.output:
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    json.dump(output, f, indent=2, ensure_ascii=False)
+            else:
+                json.dump(output, sys.stdout, indent=2, ensure_ascii=False)
+                print()
+            return
+
+        print(f"Company: {args.company}")
+        for point in output["companies"][0]["timeline"]:
+            if "error" in point:
+                print(f"  {point['year']}: ERROR {point['error']}")
+            elif not point["plans"]:
+                print(f"  {point['year']}: NO MEDICAL PLANS FOUND")
+            else:
+                print(f"  {point['year']}: {point['overall']}")
+                for p in point["plans"]:
+                    print(f"      - Plan {p['plan_number']} ({p['plan_name']}): {p['classification']}")
+        return
+
     if args.year and args.headers == "f_5500_2024_latest.csv":
         args.headers = f"f_5500_{args.year}_latest.csv"
     if args.year and args.scheda == "F_SCH_A_2024_latest.csv":
         args.scheda = f"F_SCH_A_{args.year}_latest.csv"
 
-    sa_begin_idx, sa_end_idx = build_schedA_index(args.scheda)
-
-    company_q = norm(args.company)
-    plans = []
+    if args.fuzzy is not None and (args.no_index or batch):
+        ap.error("--fuzzy needs the sponsor name index and a single --company")
 
-    with open(args.headers, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            sponsor = r.get("SPONSOR_DFE_NAME","")
-            if args.exact:
-                if norm(sponsor) != company_q:
-                    continue
-            else:
-                if company_q not in norm(sponsor):
-                    continue
-
-            if args.year is not None:
-                by = (r.get("FORM_PLAN_YEAR_BEGIN_DATE") or "")[:4]
-                ey = (r.get("FORM_TAX_PRD") or "")[:4]
-                ok = (by.isdigit() and int(by)==args.year) or (ey.isdigit() and int(ey)==args.year)
-                if not ok:
-                    if args.debug:
-                        print(f"[SKIP-YEAR] {sponsor} BY={by} EY={ey} != {args.year}")
-                    continue
-
-            has4a = has_health_4A(r.get("TYPE_WELFARE_BNFT_CODE",""))
-            ein   = (r.get("SPONS_DFE_EIN") or "").strip()
-            pnum  = (r.get("SPONS_DFE_PN") or "").strip()
-            by    = (r.get("FORM_PLAN_YEAR_BEGIN_DATE") or "")[:4]
-            ey    = (r.get("FORM_TAX_PRD") or "")[:4]
-
-            sa_h = False
-            if ein and pnum:
-                bflags = sa_begin_idx.get((ein, pnum, by), {})
-                eflags = sa_end_idx.get((ein, pnum, ey), {})
-                sa_h = (bflags.get("health", False) or eflags.get("health", False))
-                if args.debug:
-                    print(f"[SAIDX] {sponsor} PN={pnum} BY={by} EY={ey} -> {bflags},{eflags}")
-
-            if not (has4a or sa_h):
-                if args.debug:
-                    print(f"[SKIP] {sponsor} PN={pnum} BY={by} EY={ey} no 4A or SA health")
-                continue
+    if args.no_index:
+        sa_begin_idx, sa_end_idx = build_schedA_index(args.scheda)
+        name_index = None
+    else:
+        sa_begin_idx, sa_end_idx = load_schedA_index(args.scheda, args.index, args.rebuild_index)
+        name_index = open_name_index(args.headers, args.name_index, args.rebuild_index)
+        if name_index is None and args.fuzzy is not None:
+            ap.error(f"--fuzzy needs the sponsor name index, which could not be built or opened for {args.headers}")
+
+    if batch:
+        queries = read_company_queries(args.companies, args.companies_file, args.exact)
+        results = find_portfolio_plans(args.headers, queries, sa_begin_idx, sa_end_idx,
+                                       year=args.year, debug=args.debug, name_index=name_index)
+        output = {
+            "headers": args.headers,
+            "scheda": args.scheda,
+            "year": args.year,
+            "companies": [
+                {
+                    "company": company,
+                    "exact": exact,
+                    "overall": overall_classification(plans) if plans else None,
+                    "plans": plans,
+                }
+                for (company, exact), plans in zip(queries, results)
+            ],
+        }
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(output, f, indent=2, ensure_ascii=False)
+        else:
+            json.dump(output, sys.stdout, indent=2, ensure_ascii=False)
+            print()
+        return
 
-            classification, reasons, meta = classify_plan(r, sa_begin_idx, sa_end_idx)
-            plans.append({
-                "plan_name": r.get("PLAN_NAME",""),
-                "plan_number": meta["plan_number"],
-                "ein": meta["ein"],
-                "plan_year_begin": meta["plan_year_begin"],
-                "plan_year_end": meta["plan_year_end"],
-                "classification": classification,
-                "reasons": reasons,
-            })
+    plans = find_company_plans(args.headers, args.company, sa_begin_idx, sa_end_idx,
+                               exact=args.exact, year=args.year, debug=args.debug,
+                               name_index=name_index, fuzzy=args.fuzzy)
 
     if not plans:
         print(f"NO MEDICAL PLANS FOUND for company match: '{args.company}'" + (f" in year {args.year}" if args.year else ""))
         return
 
-    classes = [p["classification"] for p in plans]
-    if any(c.startswith("Self-funded") or c.startswith("Likely self-funded") for c in classes):
-        overall = "Self-funded (at least one plan)"
-    elif all(c=="Insured" or c.startswith("Likely insured") for c in classes):
-        overall = "Insured"
-    else:
-        overall = "Mixed/Indeterminate"
+    overall = overall_classification(plans)
 
     print(f"Company: {args.company}")
     if args.year:
@@ -201,4 +919,4 @@ def main():
         print()
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
@@ -4,28 +4,58 @@ HTML Report Generator for PE Firm Insurance Reports
 Generates interactive HTML reports from processed JSON data
 """
 
+import glob
+import gzip
+import hashlib
+import io
 import json
+import os
+import string
 import sys
+import time
 import argparse
-from typing import Dict, List, Any
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, TextIO, Tuple, Union
 from pathlib import Path
 
+try:
+    import brotli
+except ImportError:
+    # Optional (listed in requirements.txt): .html.br output for --precompress
+    brotli = None
+
+from insurance_records import (
+    BINARY_EXTENSION, ProcessedCompany, is_processed_binary, load_processed_binary, record_to_json
+)
+from pipeline_profiling import PROFILE_SIDECAR_SUFFIX, StageTimer, timer_or_default
+from process_data import BATCH_MANIFEST_NAME
+
+
+# Output buffer for write_html_report; rows are small, so batch them into large writes
+HTML_WRITE_BUFFER = 1 << 16
+
+# Written to the output directory of a --batch run; records each input's fingerprint
+REPORT_MANIFEST_NAME = "report_manifest.json"
+
 
 def format_currency(amount: float) -> str:
     """Format currency with commas and dollar sign"""
     return f"${amount:,.0f}"
 
 
-def generate_company_row(company: Dict[str, Any], index: int) -> str:
-    """Generate HTML for a single company row with expandable details"""
+def generate_company_row(company: Union[ProcessedCompany, Dict[str, Any]], index: int,
+                         include_details: bool = True) -> str:
+    """Generate HTML for a single company row with expandable details (or just the row)"""
+    company = ProcessedCompany.coerce(company)
     company_id = f"company-{index}"
-    company_name = company["company_name"]
-    data_year = company["data_year"]
-    has_data = company["has_data"]
-    total_premiums = company["total_premiums"]
-    total_brokerage_fees = company["total_brokerage_fees"]
-    total_people_covered = company["total_people_covered"]
-    plans = company["plans"]
+    company_name = company.company_name
+    data_year = company.data_year
+    has_data = company.has_data
+    total_premiums = company.total_premiums
+    total_brokerage_fees = company.total_brokerage_fees
+    total_people_covered = company.total_people_covered
+    plans = company.plans
     
     # Generate the main company row
     if has_data:
@@ -54,39 +84,30 @@ def generate_company_row(company: Dict[str, Any], index: int) -> str:
         </tr>'''
     
     # Generate detail rows if there's data
-    detail_rows = ""
-    if has_data and plans:
-        detail_rows = f'''
-        <tbody id="details-{company_id}" class="detail-rows">'''
+    parts = [company_row]
+    if has_data and plans and include_details:
+        parts.append(f'''
+        <tbody id="details-{company_id}" class="detail-rows">''')
         
         for plan in plans:
-            detail_rows += f'''
+            parts.append(f'''
             <tr class="detail-row">
-                <td class="plan-name">{plan["benefit_type"]} - {plan["carrier_name"]}</td>
+                <td class="plan-name">{plan.benefit_type} - {plan.carrier_name}</td>
                 <td>{data_year}</td>
-                <td class="currency">{format_currency(plan["premiums"])}</td>
-                <td class="currency">{format_currency(plan["brokerage_fees"])}</td>
-                <td class="people-count">{plan["people_covered"]:,}</td>
-            </tr>'''
+                <td class="currency">{format_currency(plan.premiums)}</td>
+                <td class="currency">{format_currency(plan.brokerage_fees)}</td>
+                <td class="people-count">{plan.people_covered:,}</td>
+            </tr>''')
         
-        detail_rows += '''
-        </tbody>'''
+        parts.append('''
+        </tbody>''')
     
-    return company_row + detail_rows
+    return "".join(parts)
 
 
-def generate_html_report(processed_data: Dict[str, Any]) -> str:
-    """Generate the complete HTML report"""
-    firm_name = processed_data["firm_name"]
-    summary = processed_data["summary"]
-    companies = processed_data["companies"]
-    
-    # Generate all company rows
-    company_rows_html = ""
-    for i, company in enumerate(companies):
-        company_rows_html += generate_company_row(company, i)
-    
-    html_template = f'''<!DOCTYPE html>
+# The HTML up to the summary (styles and header) and the summary block, as
+# str.format templates; compiled once into static chunks by compile_shell below
+REPORT_HEAD_TEMPLATE = '''<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -337,25 +358,30 @@ def generate_html_report(processed_data: Dict[str, Any]) -> str:
             <p>Insurance Costs & Brokerage Fees Report</p>
         </div>
 
-        <div class="summary">
+'''
+
+REPORT_SUMMARY_TEMPLATE = '''        <div class="summary">
             <h3>Report Summary</h3>
             <div class="summary-grid">
                 <div class="summary-item">
-                    <div class="summary-number">{summary["total_companies"]}</div>
+                    <div class="summary-number">{total_companies}</div>
                     <div>Total Companies</div>
                 </div>
                 <div class="summary-item">
-                    <div class="summary-number">{summary["companies_with_data"]}</div>
+                    <div class="summary-number">{companies_with_data}</div>
                     <div>Companies with Cost Data</div>
                 </div>
                 <div class="summary-item">
-                    <div class="summary-number">{summary["most_recent_year"]}</div>
+                    <div class="summary-number">{most_recent_year}</div>
                     <div>Most Recent Year</div>
                 </div>
             </div>
         </div>
 
-        <div class="table-section">
+'''
+
+# The table section up to the company rows for the default and lazy-details modes
+REPORT_TABLE_START = '''        <div class="table-section">
             <div class="table-container">
                 <table>
                     <thead>
@@ -368,62 +394,1214 @@ def generate_html_report(processed_data: Dict[str, Any]) -> str:
                         </tr>
                     </thead>
                     <tbody>
-                        {company_rows_html}
+                        '''
+
+
+def compile_shell(template: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    Split a str.format template once into (literal text, field name) pairs so
+    rendering only joins the static chunks with the few per-report values
+    """
+    return [(literal, field) for literal, field, _, _ in string.Formatter().parse(template)]
+
+
+def render_shell(shell: List[Tuple[str, Optional[str]]], values: Dict[str, Any]) -> str:
+    """Fill a compiled shell with values"""
+    return "".join(literal + (str(values[field]) if field is not None else "") for literal, field in shell)
+
+
+REPORT_HEAD_SHELL = compile_shell(REPORT_HEAD_TEMPLATE)
+REPORT_SUMMARY_SHELL = compile_shell(REPORT_SUMMARY_TEMPLATE)
+
+
+def generate_report_head(firm_name: str, summary: Dict[str, Any], table_start: str = REPORT_TABLE_START) -> str:
+    """Generate the HTML up to the company rows: styles, header, summary and table head"""
+    return render_shell(REPORT_HEAD_SHELL, {"firm_name": firm_name}) + render_shell(REPORT_SUMMARY_SHELL, {
+        "total_companies": summary["total_companies"],
+        "companies_with_data": summary["companies_with_data"],
+        "most_recent_year": summary["most_recent_year"]
+    }) + table_start
+
+
+# Everything after the company rows; plain text, not a template
+REPORT_TABLE_END = '''
                     </tbody>
                 </table>
             </div>
         </div>
     </div>
 
-    <script>
-        function toggleCompanyDetails(companyId) {{
+'''
+
+REPORT_SCRIPT = '''    <script>
+        function toggleCompanyDetails(companyId) {
             const detailsElement = document.getElementById('details-' + companyId);
             const arrowElement = document.getElementById('arrow-' + companyId);
             const companyRow = arrowElement.closest('.company-row');
             
-            if (detailsElement.classList.contains('expanded')) {{
+            if (detailsElement.classList.contains('expanded')) {
                 // Collapse
                 detailsElement.classList.remove('expanded');
                 arrowElement.classList.remove('expanded');
                 companyRow.classList.remove('expanded');
-            }} else {{
+            } else {
                 // Expand
                 detailsElement.classList.add('expanded');
                 arrowElement.classList.add('expanded');
                 companyRow.classList.add('expanded');
-            }}
-        }}
+            }
+        }
+    </script>
+</body>
+</html>'''
+
+REPORT_FOOTER = REPORT_TABLE_END + REPORT_SCRIPT
+
+# Lazy-details mode: detail rows are built from the #plan-data payload on first expand.
+# The new tbody is placed right after the company row's group, splitting the group the
+# same way the browser splits the inline markup, so the rendered table is identical.
+LAZY_REPORT_SCRIPT = '''    <script>
+        let planData = null;
+
+        function formatCurrency(amount) {
+            return '$' + amount.toLocaleString('en-US');
+        }
+
+        function renderCompanyDetails(companyId, companyRow) {
+            if (planData === null) {
+                planData = JSON.parse(document.getElementById('plan-data').textContent);
+            }
+            const entry = planData.companies[companyId.slice('company-'.length)] || [0, []];
+            const strings = planData.strings;
+            const year = strings[entry[0]];
+            const plans = entry[1];
+            
+            const detailsElement = document.createElement('tbody');
+            detailsElement.id = 'details-' + companyId;
+            detailsElement.className = 'detail-rows';
+            for (let i = 0; i < plans.length; i += 5) {
+                const row = detailsElement.insertRow();
+                row.className = 'detail-row';
+                const cells = [
+                    ['plan-name', strings[plans[i]] + ' - ' + strings[plans[i + 1]]],
+                    ['', year],
+                    ['currency', formatCurrency(plans[i + 2])],
+                    ['currency', formatCurrency(plans[i + 3])],
+                    ['people-count', plans[i + 4].toLocaleString('en-US')]
+                ];
+                for (const [className, text] of cells) {
+                    const cell = row.insertCell();
+                    if (className) {
+                        cell.className = className;
+                    }
+                    cell.textContent = text;
+                }
+            }
+            
+            const group = companyRow.parentNode;
+            const rest = document.createElement('tbody');
+            while (companyRow.nextSibling) {
+                rest.appendChild(companyRow.nextSibling);
+            }
+            group.parentNode.insertBefore(detailsElement, group.nextSibling);
+            if (rest.firstChild) {
+                group.parentNode.insertBefore(rest, detailsElement.nextSibling);
+            }
+            return detailsElement;
+        }
+
+        function toggleCompanyDetails(companyId) {
+            const arrowElement = document.getElementById('arrow-' + companyId);
+            const companyRow = arrowElement.closest('.company-row');
+            const detailsElement = document.getElementById('details-' + companyId)
+                || renderCompanyDetails(companyId, companyRow);
+            
+            if (detailsElement.classList.contains('expanded')) {
+                // Collapse
+                detailsElement.classList.remove('expanded');
+                arrowElement.classList.remove('expanded');
+                companyRow.classList.remove('expanded');
+            } else {
+                // Expand
+                detailsElement.classList.add('expanded');
+                arrowElement.classList.add('expanded');
+                companyRow.classList.add('expanded');
+            }
+        }
+    </script>
+</body>
+</html>'''
+
+
+# Virtual-table mode: the table section with sortable headers and a name filter.
+# Rows are rendered by VIRTUAL_REPORT_SCRIPT from the #report-data payload.
+VIRTUAL_TABLE_START = '''        <style>
+            .table-filter {
+                padding: 15px;
+                border-bottom: 1px solid #e9ecef;
+            }
+
+            .table-filter input {
+                width: 100%;
+                max-width: 400px;
+                padding: 10px 14px;
+                border: 1px solid #dee2e6;
+                border-radius: 8px;
+                font-family: inherit;
+                font-size: 0.95rem;
+            }
+
+            th.sortable {
+                cursor: pointer;
+                user-select: none;
+            }
+
+            th.sorted-desc::after {
+                content: ' ▼';
+            }
+
+            th.sorted-asc::after {
+                content: ' ▲';
+            }
+
+            .virtual-spacer td {
+                padding: 0;
+                border: none;
+            }
+
+            .no-match td {
+                padding: 18px 15px;
+                color: #6c757d;
+                text-align: center;
+            }
+        </style>
+
+        <div class="table-section">
+            <div class="table-filter">
+                <input type="search" id="company-filter" placeholder="Filter companies by name" autocomplete="off">
+            </div>
+            <div class="table-container">
+                <table id="company-table">
+                    <thead>
+                        <tr>
+                            <th class="sortable" data-sort="name">Company Name</th>
+                            <th>Data Year</th>
+                            <th class="sortable" data-sort="premiums">Total Premiums</th>
+                            <th class="sortable" data-sort="brokerage_fees">Total Brokerage Fees</th>
+                            <th class="sortable" data-sort="people_covered">People Covered</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                    </tbody>
+                </table>
+            </div>
+        </div>
+    </div>
+
+'''
+
+VIRTUAL_REPORT_SCRIPT = '''    <script>
+        const reportData = JSON.parse(document.getElementById('report-data').textContent);
+        const strings = reportData.strings;
+        const companies = reportData.companies;
+        const companyCount = companies.name.length;
+        const table = document.getElementById('company-table');
+        // Rows rendered above and below the viewport so fast scrolling does not show gaps
+        const OVERSCAN_ROWS = 10;
+
+        const expandedCompanies = new Set();
+        let sortKey = null;         // null keeps the original order
+        let sortReversed = false;   // permutations are descending (ascending for name)
+        let filterQuery = '';
+        let visibleOrder = null;    // company indices in display order while a filter is active
+        let lineOffsets = null;     // prefix sums of row heights while any company is expanded
+        let lowerNames = null;
+        let companyRowHeight = 59;
+        let detailRowHeight = 45;
+        let renderPending = false;
+
+        function escapeHtml(text) {
+            return String(text).replace(/[&<>"']/g, (c) => `&#${c.charCodeAt(0)};`);
+        }
+
+        function formatCurrency(amount) {
+            return '$' + amount.toLocaleString('en-US');
+        }
+
+        // Company index at a display position without a filter: constant time for any sort
+        function orderedIndex(position) {
+            const p = sortReversed ? companyCount - 1 - position : position;
+            return sortKey ? reportData.orders[sortKey][p] : p;
+        }
+
+        function visibleCount() {
+            return visibleOrder ? visibleOrder.length : companyCount;
+        }
+
+        function visibleCompany(position) {
+            return visibleOrder ? visibleOrder[position] : orderedIndex(position);
+        }
+
+        function companyHeight(index) {
+            const plans = companies.plans[index];
+            return companyRowHeight + (expandedCompanies.has(index) ? plans.length / 5 * detailRowHeight : 0);
+        }
+
+        function rebuildOffsets() {
+            if (expandedCompanies.size === 0) {
+                lineOffsets = null;
+                return;
+            }
+            const count = visibleCount();
+            lineOffsets = new Float64Array(count + 1);
+            for (let p = 0; p < count; p++) {
+                lineOffsets[p + 1] = lineOffsets[p] + companyHeight(visibleCompany(p));
+            }
+        }
+
+        function offsetOf(position) {
+            return lineOffsets ? lineOffsets[position] : position * companyRowHeight;
+        }
+
+        function positionAt(y) {
+            if (!lineOffsets) {
+                return Math.floor(y / companyRowHeight);
+            }
+            let low = 0;
+            let high = visibleCount();
+            while (low < high) {
+                const mid = (low + high + 1) >> 1;
+                if (lineOffsets[mid] <= y) {
+                    low = mid;
+                } else {
+                    high = mid - 1;
+                }
+            }
+            return low;
+        }
+
+        function companyRowHtml(index) {
+            const companyId = `company-${index}`;
+            const hasData = companies.has_data[index] === 1;
+            const expanded = expandedCompanies.has(index) ? ' expanded' : '';
+            const yearBadge = hasData
+                ? `<span class="year-badge">${escapeHtml(strings[companies.year[index]])}</span>`
+                : '<span class="no-data-badge">No Data</span>';
+            const onclick = hasData ? ` onclick="toggleCompanyDetails('${companyId}')"` : '';
+            const arrow = hasData ? `<div class="expand-arrow${expanded}" id="arrow-${companyId}"></div>` : '';
+            return `<tr class="company-row${expanded}"${onclick}>`
+                + `<td><div class="company-name">${arrow}${escapeHtml(companies.name[index])}</div></td>`
+                + `<td>${yearBadge}</td>`
+                + `<td class="currency total">${formatCurrency(companies.premiums[index])}</td>`
+                + `<td class="currency total">${formatCurrency(companies.brokerage_fees[index])}</td>`
+                + `<td class="people-count">${companies.people_covered[index].toLocaleString('en-US')}</td>`
+                + '</tr>';
+        }
+
+        function detailRowsHtml(index) {
+            const plans = companies.plans[index];
+            const year = escapeHtml(strings[companies.year[index]]);
+            const rows = [`<tbody id="details-company-${index}" class="detail-rows expanded">`];
+            for (let i = 0; i < plans.length; i += 5) {
+                rows.push('<tr class="detail-row">'
+                    + `<td class="plan-name">${escapeHtml(strings[plans[i]])} - ${escapeHtml(strings[plans[i + 1]])}</td>`
+                    + `<td>${year}</td>`
+                    + `<td class="currency">${formatCurrency(plans[i + 2])}</td>`
+                    + `<td class="currency">${formatCurrency(plans[i + 3])}</td>`
+                    + `<td class="people-count">${plans[i + 4].toLocaleString('en-US')}</td>`
+                    + '</tr>');
+            }
+            rows.push('</tbody>');
+            return rows.join('');
+        }
+
+        function spacerHtml(height) {
+            return `<tr class="virtual-spacer"><td colspan="5" style="height: ${height}px"></td></tr>`;
+        }
+
+        function render() {
+            renderPending = false;
+            const count = visibleCount();
+            const bodyTop = table.tHead.getBoundingClientRect().bottom + window.scrollY;
+            const viewTop = Math.max(0, window.scrollY - bodyTop);
+            const viewBottom = window.scrollY + window.innerHeight - bodyTop;
+
+            const first = Math.max(0, Math.min(count, positionAt(viewTop)) - OVERSCAN_ROWS);
+            let last = first;
+            while (last < count && offsetOf(last) < viewBottom) {
+                last++;
+            }
+            last = Math.min(count, last + OVERSCAN_ROWS);
+
+            const parts = ['<tbody>', spacerHtml(offsetOf(first))];
+            if (count === 0) {
+                parts.push('<tr class="no-match"><td colspan="5">No companies match the filter</td></tr>');
+            }
+            for (let p = first; p < last; p++) {
+                const index = visibleCompany(p);
+                parts.push(companyRowHtml(index));
+                if (expandedCompanies.has(index)) {
+                    parts.push('</tbody>', detailRowsHtml(index), '<tbody>');
+                }
+            }
+            parts.push(spacerHtml(offsetOf(count) - offsetOf(last)), '</tbody>');
+
+            for (const body of Array.from(table.tBodies)) {
+                body.remove();
+            }
+            table.insertAdjacentHTML('beforeend', parts.join(''));
+            measureRows();
+        }
+
+        // Replace the row height estimates with the real ones once rows exist
+        function measureRows() {
+            let changed = false;
+            const companyRow = table.querySelector('.company-row');
+            if (companyRow && Math.abs(companyRow.getBoundingClientRect().height - companyRowHeight) > 0.5) {
+                companyRowHeight = companyRow.getBoundingClientRect().height;
+                changed = true;
+            }
+            const detailRow = table.querySelector('.detail-row');
+            if (detailRow && Math.abs(detailRow.getBoundingClientRect().height - detailRowHeight) > 0.5) {
+                detailRowHeight = detailRow.getBoundingClientRect().height;
+                changed = true;
+            }
+            if (changed) {
+                rebuildOffsets();
+                scheduleRender();
+            }
+        }
+
+        function scheduleRender() {
+            if (!renderPending) {
+                renderPending = true;
+                window.requestAnimationFrame(render);
+            }
+        }
+
+        function toggleCompanyDetails(companyId) {
+            const index = Number(companyId.slice('company-'.length));
+            if (expandedCompanies.has(index)) {
+                expandedCompanies.delete(index);
+            } else {
+                expandedCompanies.add(index);
+            }
+            rebuildOffsets();
+            scheduleRender();
+        }
+
+        function sortCompanies(key) {
+            if (sortKey === key) {
+                sortReversed = !sortReversed;
+            } else {
+                sortKey = key;
+                sortReversed = false;
+            }
+            if (visibleOrder) {
+                // Re-apply the filter in the new order
+                const matches = new Uint8Array(companyCount);
+                for (const index of visibleOrder) {
+                    matches[index] = 1;
+                }
+                visibleOrder = [];
+                for (let p = 0; p < companyCount; p++) {
+                    const index = orderedIndex(p);
+                    if (matches[index]) {
+                        visibleOrder.push(index);
+                    }
+                }
+            }
+            for (const header of table.querySelectorAll('th.sortable')) {
+                header.classList.remove('sorted-asc', 'sorted-desc');
+                if (header.dataset.sort === key) {
+                    const ascending = (key === 'name') !== sortReversed;
+                    header.classList.add(ascending ? 'sorted-asc' : 'sorted-desc');
+                }
+            }
+            rebuildOffsets();
+            scheduleRender();
+        }
+
+        function filterCompanies(query) {
+            query = query.trim().toLowerCase();
+            if (!query) {
+                visibleOrder = null;
+            } else if (visibleOrder && query.startsWith(filterQuery)) {
+                // Narrowing the query only needs to re-check the current matches
+                visibleOrder = visibleOrder.filter((index) => lowerNames[index].includes(query));
+            } else {
+                if (lowerNames === null) {
+                    lowerNames = companies.name.map((name) => name.toLowerCase());
+                }
+                visibleOrder = [];
+                for (let p = 0; p < companyCount; p++) {
+                    const index = orderedIndex(p);
+                    if (lowerNames[index].includes(query)) {
+                        visibleOrder.push(index);
+                    }
+                }
+            }
+            filterQuery = query;
+            rebuildOffsets();
+            scheduleRender();
+        }
+
+        for (const header of table.querySelectorAll('th.sortable')) {
+            header.addEventListener('click', () => sortCompanies(header.dataset.sort));
+        }
+        document.getElementById('company-filter').addEventListener('input', (event) => filterCompanies(event.target.value));
+        window.addEventListener('scroll', scheduleRender, { passive: true });
+        window.addEventListener('resize', scheduleRender);
+        render();
     </script>
 </body>
 </html>'''
+
+
+class PlanPayload:
+    """
+    Compact JSON payload of every company's plans for lazy-details reports.
+    Strings (years, benefit types, carriers) are dictionary-encoded into one
+    table; each company is [year code, flat plan list] where every plan is
+    five numbers: benefit type code, carrier code, premiums, fees, people.
+    Amounts are rounded to whole dollars, as the inline rows display them.
+    """
+    
+    def __init__(self):
+        self.strings = {}
+        self.companies = {}
+    
+    def _code(self, value: Optional[str]) -> int:
+        value = "" if value is None else str(value)
+        code = self.strings.get(value)
+        if code is None:
+            code = self.strings[value] = len(self.strings)
+        return code
+    
+    def _plans(self, company: ProcessedCompany) -> List[int]:
+        flat = []
+        for plan in company.plans:
+            flat.extend((self._code(plan.benefit_type), self._code(plan.carrier_name),
+                         round(plan.premiums), round(plan.brokerage_fees), plan.people_covered))
+        return flat
+    
+    def add(self, company: ProcessedCompany, index: int) -> None:
+        if not (company.has_data and company.plans):
+            return
+        self.companies[str(index)] = [self._code(company.data_year), self._plans(company)]
     
-    return html_template
+    def payload(self) -> Dict[str, Any]:
+        return {"strings": list(self.strings), "companies": self.companies}
+    
+    def to_script(self, element_id: str = "plan-data") -> str:
+        """The payload as a JSON data block, safe to embed in HTML"""
+        payload = json.dumps(self.payload(), ensure_ascii=False, separators=(",", ":"))
+        return (f'    <script id="{element_id}" type="application/json">'
+                + payload.replace("</", "<\\/") + '</script>\n')
 
 
-def generate_report(input_file: str, output_file: str) -> None:
+class CompanyTablePayload(PlanPayload):
     """
-    Main report generation function
+    PlanPayload for virtual-table reports: every company as columns (name, year
+    code, has_data, rounded totals, flat plan list) plus sort permutations built
+    here so the page re-sorts by switching permutations instead of sorting.
+    Number columns are ordered largest first and names A-Z; ties keep the
+    original order.
     """
+    
+    SORT_KEYS = ("premiums", "brokerage_fees", "people_covered")
+    
+    def __init__(self):
+        super().__init__()
+        self.companies = {"name": [], "year": [], "has_data": [], "premiums": [], "brokerage_fees": [],
+                          "people_covered": [], "plans": []}
+    
+    def add(self, company: ProcessedCompany, index: int) -> None:
+        columns = self.companies
+        columns["name"].append(company.company_name or "")
+        columns["year"].append(self._code(company.data_year))
+        columns["has_data"].append(1 if company.has_data else 0)
+        columns["premiums"].append(round(company.total_premiums))
+        columns["brokerage_fees"].append(round(company.total_brokerage_fees))
+        columns["people_covered"].append(company.total_people_covered)
+        columns["plans"].append(self._plans(company) if company.has_data else [])
+    
+    def payload(self) -> Dict[str, Any]:
+        columns = self.companies
+        positions = range(len(columns["name"]))
+        orders = {key: sorted(positions, key=lambda i, values=columns[key]: -values[i]) for key in self.SORT_KEYS}
+        names = [name.casefold() for name in columns["name"]]
+        orders["name"] = sorted(positions, key=names.__getitem__)
+        return {"strings": list(self.strings), "companies": columns, "orders": orders}
+
+
+def write_html_report(processed_data: Dict[str, Any], out: TextIO, lazy_details: bool = False,
+                      virtual_table: bool = False) -> None:
+    """
+    Write the complete HTML report to a text file handle in order (head and
+    summary, one company at a time, footer), so memory stays bounded by the
+    largest company and time grows linearly with the number of rows.
+    
+    With lazy_details, plan detail rows are not written as markup; the plans go
+    into one PlanPayload block and the page renders a company's details the
+    first time it is expanded.
+    
+    With virtual_table, no rows are written at all: the companies go into one
+    CompanyTablePayload block and the page renders only the rows in view, with
+    precomputed sorting by name/premiums/fees/people and a name filter.
+    """
+    if virtual_table:
+        out.write(generate_report_head(processed_data["firm_name"], processed_data["summary"], VIRTUAL_TABLE_START))
+        payload = CompanyTablePayload()
+        for i, company in enumerate(processed_data["companies"]):
+            payload.add(ProcessedCompany.coerce(company), i)
+        out.write(payload.to_script("report-data"))
+        out.write(VIRTUAL_REPORT_SCRIPT)
+        return
+    
+    out.write(generate_report_head(processed_data["firm_name"], processed_data["summary"]))
+    write_company_table(processed_data["companies"], out, lazy_details)
+
+
+def write_company_table(companies: List[Any], out: TextIO, lazy_details: bool = False,
+                        first_index: int = 0) -> None:
+    """
+    Write company rows (numbered from first_index), the end of the table and the
+    page script; the head up to the table body must already be written
+    """
+    if not lazy_details:
+        for i, company in enumerate(companies, first_index):
+            out.write(generate_company_row(company, i))
+        out.write(REPORT_FOOTER)
+        return
+    
+    payload = PlanPayload()
+    for i, company in enumerate(companies, first_index):
+        company = ProcessedCompany.coerce(company)
+        out.write(generate_company_row(company, i, include_details=False))
+        payload.add(company, i)
+    out.write(REPORT_TABLE_END)
+    out.write(payload.to_script())
+    out.write(LAZY_REPORT_SCRIPT)
+
+
+def generate_html_report(processed_data: Dict[str, Any], lazy_details: bool = False,
+                         virtual_table: bool = False) -> str:
+    """Generate the complete HTML report"""
+    buffer = io.StringIO()
+    write_html_report(processed_data, buffer, lazy_details, virtual_table)
+    return buffer.getvalue()
+
+
+# Paginated reports: an index page with the summary and per-page totals, plus
+# pages of page_size companies each. Every page is fingerprinted in the
+# <index>.pages.json manifest so unchanged pages are not rewritten.
+PAGE_MANIFEST_SUFFIX = ".pages.json"
+
+PAGE_NAV_TEMPLATE = '''        <style>
+            .page-nav a {{
+                color: #667eea;
+                font-weight: 600;
+                text-decoration: none;
+            }}
+
+            .page-nav p {{
+                color: #6c757d;
+            }}
+        </style>
+
+        <div class="summary page-nav">
+            <h3>Companies {first_company}-{last_company} of {total_companies}</h3>
+            <p>{links}</p>
+        </div>
+
+'''
+
+PAGE_INDEX_TABLE_START = '''        <div class="table-section">
+            <div class="table-container">
+                <table>
+                    <thead>
+                        <tr>
+                            <th>Page</th>
+                            <th>Companies</th>
+                            <th>Total Premiums</th>
+                            <th>Total Brokerage Fees</th>
+                            <th>People Covered</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                        '''
+
+PAGE_INDEX_FOOTER = REPORT_TABLE_END + '''</body>
+</html>'''
+
+PAGE_NAV_SHELL = compile_shell(PAGE_NAV_TEMPLATE)
+
+
+def page_output_path(output_file: str, page_number: int) -> str:
+    """Path of page page_number (1-based) of a paginated report: <stem>-page-0001.html next to the index"""
+    path = Path(output_file)
+    return str(path.with_name(f"{path.stem}-page-{page_number:04d}{path.suffix or '.html'}"))
+
+
+def write_report_page(firm_name: str, companies: List[ProcessedCompany], first_index: int, page_number: int,
+                      page_count: int, total_companies: int, index_name: str, page_names: List[str],
+                      out: TextIO, lazy_details: bool = False) -> None:
+    """Write one page of a paginated report: header, page navigation and its companies"""
+    links = [f'<a href="{index_name}">Report summary</a>']
+    if page_number > 1:
+        links.append(f'<a href="{page_names[page_number - 2]}">&larr; Previous</a>')
+    links.append(f"Page {page_number} of {page_count}")
+    if page_number < page_count:
+        links.append(f'<a href="{page_names[page_number]}">Next &rarr;</a>')
+    
+    out.write(render_shell(REPORT_HEAD_SHELL, {"firm_name": firm_name}))
+    out.write(render_shell(PAGE_NAV_SHELL, {
+        "first_company": first_index + 1,
+        "last_company": first_index + len(companies),
+        "total_companies": total_companies,
+        "links": " &middot; ".join(links)
+    }))
+    out.write(REPORT_TABLE_START)
+    write_company_table(companies, out, lazy_details, first_index)
+
+
+def write_report_index(firm_name: str, summary: Dict[str, Any], pages: List[Dict[str, Any]], out: TextIO) -> None:
+    """Write the index page of a paginated report: the summary block and one row per page"""
+    out.write(generate_report_head(firm_name, summary, PAGE_INDEX_TABLE_START))
+    for page in pages:
+        out.write(f'''
+        <tr class="company-row" onclick="window.location.href='{page['name']}'">
+            <td>
+                <div class="company-name">
+                    <a href="{page['name']}">Page {page['page_number']}</a>
+                </div>
+            </td>
+            <td>{page['first_company']} &ndash; {page['last_company']}</td>
+            <td class="currency total">{format_currency(page['total_premiums'])}</td>
+            <td class="currency total">{format_currency(page['total_brokerage_fees'])}</td>
+            <td class="people-count">{page['total_people_covered']:,}</td>
+        </tr>''')
+    out.write(PAGE_INDEX_FOOTER)
+
+
+def _fingerprint(*parts: Any) -> str:
+    digest = hashlib.sha256(renderer_fingerprint().encode("ascii"))
+    for part in parts:
+        digest.update(json.dumps(part, sort_keys=True, ensure_ascii=False, default=record_to_json).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _render_page(output_file: str, firm_name: str, companies: List[ProcessedCompany], first_index: int,
+                 page_number: int, page_count: int, total_companies: int, index_name: str,
+                 page_names: List[str], lazy_details: bool, precompress: bool) -> Dict[str, Any]:
+    """Render one page to its own file(s); runs in a pool worker when pages render in parallel"""
+    output = ReportOutput(output_file, precompress)
     try:
-        # Load the processed JSON data
+        write_report_page(firm_name, companies, first_index, page_number, page_count, total_companies,
+                          index_name, page_names, output, lazy_details)
+    finally:
+        artifacts = output.close()
+    return {"html_bytes": output.html_bytes, "precompressed": artifacts}
+
+
+def write_paginated_report(processed_data: Dict[str, Any], output_file: str, page_size: int,
+                           workers: Optional[int] = None, lazy_details: bool = False,
+                           precompress: bool = False, force: bool = False) -> Dict[str, Any]:
+    """
+    Render a report as an index page (output_file) plus pages of page_size
+    companies, rendering pages in parallel across a process pool. Pages and the
+    index whose fingerprint (their companies, position and render options)
+    matches the <output_file>.pages.json manifest are left untouched, so
+    changing one company only rewrites its page (and the index when totals move).
+    Pages left over from an earlier, longer report are deleted.
+    """
+    if page_size < 1:
+        raise ValueError("page_size must be at least 1")
+    
+    firm_name = processed_data["firm_name"]
+    summary = processed_data["summary"]
+    companies = [ProcessedCompany.coerce(company) for company in processed_data["companies"]]
+    total_companies = len(companies)
+    page_count = max(1, -(-total_companies // page_size))
+    index_name = Path(output_file).name
+    page_paths = [page_output_path(output_file, number) for number in range(1, page_count + 1)]
+    page_names = [Path(path).name for path in page_paths]
+    options = {"lazy_details": lazy_details, "precompress": precompress,
+               "brotli": precompress and brotli is not None}
+    
+    manifest_path = f"{output_file}{PAGE_MANIFEST_SUFFIX}"
+    previous = {}
+    if Path(manifest_path).exists():
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                previous = {entry["path"]: entry for entry in json.load(f).get("files", [])}
+        except (ValueError, KeyError, AttributeError):
+            previous = {}
+    
+    def unchanged(path: str, fingerprint: str) -> bool:
+        entry = previous.get(path)
+        return (not force and entry is not None and entry["fingerprint"] == fingerprint and Path(path).exists()
+                and all(Path(artifact["path"]).exists() for artifact in entry.get("precompressed", [])))
+    
+    pages = []
+    pending = []
+    for number, path in enumerate(page_paths, 1):
+        first_index = (number - 1) * page_size
+        page_companies = companies[first_index:first_index + page_size]
+        fingerprint = _fingerprint(firm_name, page_companies, first_index, number, page_count, total_companies,
+                                   index_name, options)
+        page = {
+            "path": path,
+            "name": page_names[number - 1],
+            "page_number": number,
+            "first_company": page_companies[0].company_name if page_companies else "",
+            "last_company": page_companies[-1].company_name if page_companies else "",
+            "companies": len(page_companies),
+            "total_premiums": sum(company.total_premiums for company in page_companies),
+            "total_brokerage_fees": sum(company.total_brokerage_fees for company in page_companies),
+            "total_people_covered": sum(company.total_people_covered for company in page_companies),
+            "fingerprint": fingerprint
+        }
+        pages.append(page)
+        if unchanged(path, fingerprint):
+            page.update(status="skipped", html_bytes=previous[path].get("html_bytes"),
+                        precompressed=previous[path].get("precompressed", []))
+        else:
+            pending.append((page, (path, firm_name, page_companies, first_index, number, page_count,
+                                   total_companies, index_name, page_names, lazy_details, precompress)))
+    
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending) or 1))
+    if workers == 1:
+        results = [_render_page(*arguments) for _, arguments in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_page, *zip(*(arguments for _, arguments in pending))))
+    for (page, _), result in zip(pending, results):
+        page.update(status="rendered", **result)
+    
+    index_fingerprint = _fingerprint(firm_name, summary, [{name: page[name] for name in (
+        "name", "first_company", "last_company", "total_premiums", "total_brokerage_fees", "total_people_covered"
+    )} for page in pages], options)
+    index = {"path": output_file, "fingerprint": index_fingerprint}
+    if unchanged(output_file, index_fingerprint):
+        index.update(status="skipped", html_bytes=previous[output_file].get("html_bytes"),
+                     precompressed=previous[output_file].get("precompressed", []))
+    else:
+        output = ReportOutput(output_file, precompress)
+        try:
+            write_report_index(firm_name, summary, pages, output)
+        finally:
+            index.update(status="rendered", html_bytes=output.html_bytes, precompressed=output.close())
+    
+    # Drop pages from an earlier, longer run, and compressed copies this run no longer writes
+    files = [index] + pages
+    current = {entry["path"] for entry in files}
+    current.update(artifact["path"] for entry in files for artifact in entry["precompressed"])
+    for path, entry in previous.items():
+        for stale in [path] + [artifact["path"] for artifact in entry.get("precompressed", [])]:
+            if stale not in current:
+                Path(stale).unlink(missing_ok=True)
+    
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "firm_name": firm_name,
+            "page_size": page_size,
+            "page_count": page_count,
+            "files": files
+        }, f, indent=2, ensure_ascii=False)
+    
+    return {
+        "index_file": output_file,
+        "page_count": page_count,
+        "workers": workers,
+        "rendered": sum(1 for entry in files if entry["status"] == "rendered"),
+        "skipped": sum(1 for entry in files if entry["status"] == "skipped"),
+        "files": files
+    }
+
+
+def load_processed_data(input_file: str, timer: Optional[StageTimer] = None) -> Dict[str, Any]:
+    """
+    Load a processed file (JSON, or the columnar binary format) with its companies as ProcessedCompany records
+    """
+    timer = timer_or_default(timer)
+    if is_processed_binary(input_file):
+        # Memory-mapped and decoded in one step
+        with timer.stage("load"):
+            return load_processed_binary(input_file)
+    
+    with timer.stage("read"):
         with open(input_file, 'r', encoding='utf-8') as f:
-            processed_data = json.load(f)
+            processed_text = f.read()
+    with timer.stage("parse"):
+        processed_data = json.loads(processed_text)
+        processed_data["companies"] = [ProcessedCompany.from_dict(company) for company in processed_data["companies"]]
+    return processed_data
+
+
+class ReportOutput:
+    """
+    Text sink for write_html_report that writes the UTF-8 HTML file and, with
+    precompress, gzip (.gz) and brotli (.br, when the brotli module is
+    installed) copies next to it in the same pass, so static servers can send
+    pre-encoded files. Output is buffered into HTML_WRITE_BUFFER-sized chunks.
+    """
+    
+    def __init__(self, output_file: str, precompress: bool = False):
+        self.output_file = output_file
+        self.html_bytes = 0
+        self._pending = []
+        self._pending_bytes = 0
+        self._html = open(output_file, 'wb')
+        self._gzip = None
+        self._brotli = None
+        self._brotli_file = None
+        if precompress:
+            # mtime=0 keeps the .gz byte-identical across runs for identical HTML
+            self._gzip = gzip.GzipFile(filename=Path(output_file).name, mode='wb', compresslevel=9, mtime=0,
+                                       fileobj=open(f"{output_file}.gz", 'wb'))
+            if brotli is not None:
+                self._brotli = brotli.Compressor(mode=brotli.MODE_TEXT, quality=11)
+                self._brotli_file = open(f"{output_file}.br", 'wb')
+            else:
+                # A .br left from a run with brotli would no longer match the HTML
+                Path(f"{output_file}.br").unlink(missing_ok=True)
+    
+    def write(self, text: str) -> int:
+        self._pending.append(text)
+        self._pending_bytes += len(text)
+        if self._pending_bytes >= HTML_WRITE_BUFFER:
+            self._flush()
+        return len(text)
+    
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        data = "".join(self._pending).encode("utf-8")
+        self._pending = []
+        self._pending_bytes = 0
+        self.html_bytes += len(data)
+        self._html.write(data)
+        if self._gzip:
+            self._gzip.write(data)
+        if self._brotli:
+            self._brotli_file.write(self._brotli.process(data))
+    
+    def close(self) -> List[Dict[str, Any]]:
+        """Finish every file and describe the precompressed copies (path, encoding, bytes, ratio)"""
+        self._flush()
+        self._html.close()
+        artifacts = []
+        if self._gzip:
+            gzip_file = self._gzip.fileobj
+            self._gzip.close()
+            gzip_file.close()
+            artifacts.append(self._artifact(f"{self.output_file}.gz", "gzip"))
+        if self._brotli:
+            self._brotli_file.write(self._brotli.finish())
+            self._brotli_file.close()
+            artifacts.append(self._artifact(f"{self.output_file}.br", "br"))
+        return artifacts
+    
+    def _artifact(self, path: str, encoding: str) -> Dict[str, Any]:
+        size = Path(path).stat().st_size
+        return {
+            "path": path,
+            "encoding": encoding,
+            "bytes": size,
+            "source_bytes": self.html_bytes,
+            "ratio": round(self.html_bytes / size, 2) if size else None
+        }
+
+
+def render_report_file(input_file: str, output_file: str, timer: Optional[StageTimer] = None,
+                       lazy_details: bool = False, virtual_table: bool = False,
+                       precompress: bool = False, page_size: Optional[int] = None,
+                       page_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Load one processed file and render its report to output_file (plus the
+    precompressed copies with precompress). With page_size, output_file is the
+    index of a paginated report (see write_paginated_report).
+    Errors are raised to the caller. Returns firm_name, summary, output_file,
+    html_bytes and precompressed artifacts (of the files written this run),
+    plus "pages" for paginated reports.
+    """
+    if page_size and virtual_table:
+        raise ValueError("Paginated reports cannot use the virtual table")
+    
+    timer = timer_or_default(timer)
+    
+    # Load the processed JSON data
+    processed_data = load_processed_data(input_file, timer)
+    
+    return render_processed_data(processed_data, output_file, timer, lazy_details, virtual_table,
+                                 precompress, page_size, page_workers)
+
+
+def render_processed_data(processed_data: Dict[str, Any], output_file: str,
+                          timer: Optional[StageTimer] = None,
+                          lazy_details: bool = False, virtual_table: bool = False,
+                          precompress: bool = False, page_size: Optional[int] = None,
+                          page_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Render an in-memory processed data block (as loaded by load_processed_data,
+    or straight from process_data.build_processed_data) to output_file.
+    Takes the same rendering options and returns the same dict as render_report_file.
+    """
+    if page_size and virtual_table:
+        raise ValueError("Paginated reports cannot use the virtual table")
+    
+    timer = timer_or_default(timer)
+    
+    if page_size:
+        with timer.stage("render"):
+            pages = write_paginated_report(processed_data, output_file, page_size, page_workers,
+                                           lazy_details, precompress)
+        rendered = [entry for entry in pages["files"] if entry["status"] == "rendered"]
+        return {
+            "firm_name": processed_data["firm_name"],
+            "summary": processed_data["summary"],
+            "output_file": output_file,
+            "html_bytes": sum(entry["html_bytes"] for entry in rendered),
+            "precompressed": [artifact for entry in rendered for artifact in entry["precompressed"]],
+            "pages": pages
+        }
+    
+    # Render the HTML report straight into the output files (writes and compression are counted under render)
+    with timer.stage("render"):
+        output = ReportOutput(output_file, precompress)
+        try:
+            write_html_report(processed_data, output, lazy_details, virtual_table)
+        finally:
+            artifacts = output.close()
+    
+    return {
+        "firm_name": processed_data["firm_name"],
+        "summary": processed_data["summary"],
+        "output_file": output_file,
+        "html_bytes": output.html_bytes,
+        "precompressed": artifacts
+    }
+
+
+_renderer_digest = None
+
+
+def renderer_fingerprint() -> str:
+    """Hash of this renderer's source, so any template or row markup change invalidates existing reports"""
+    global _renderer_digest
+    if _renderer_digest is None:
+        _renderer_digest = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+    return _renderer_digest
+
+
+def input_fingerprint(input_file: str, previous: Optional[Dict[str, Any]] = None,
+                      options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Fingerprint of a processed file for the report manifest: size, mtime and the
+    SHA-256 of its content plus the renderer fingerprint and render options. The
+    content hash is reused from previous when size and mtime are unchanged.
+    """
+    stat = Path(input_file).stat()
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if previous and all(previous.get(name) == fingerprint[name] for name in ("size", "mtime_ns")) \
+            and previous.get("renderer") == renderer_fingerprint():
+        fingerprint["sha256"] = previous["sha256"]
+    else:
+        digest = hashlib.sha256()
+        with open(input_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        fingerprint["sha256"] = digest.hexdigest()
+    fingerprint["renderer"] = renderer_fingerprint()
+    fingerprint["options"] = options or {}
+    return fingerprint
+
+
+def same_content(previous: Optional[Dict[str, Any]], fingerprint: Dict[str, Any]) -> bool:
+    """Whether two fingerprints describe the same content rendered the same way (mtime may differ)"""
+    return bool(previous) and all(previous.get(name) == fingerprint[name]
+                                  for name in ("sha256", "renderer", "options"))
+
+
+def find_processed_files(source: str) -> List[str]:
+    """
+    Resolve a directory (every processed .json or binary file inside) or a glob pattern to processed files
+    """
+    if Path(source).is_dir():
+        paths = [str(path) for pattern in ("*.json", f"*{BINARY_EXTENSION}") for path in Path(source).glob(pattern)]
+    else:
+        paths = glob.glob(source)
+    return sorted(path for path in paths
+                  if not path.endswith((PROFILE_SIDECAR_SUFFIX, PAGE_MANIFEST_SUFFIX, BATCH_MANIFEST_NAME,
+                                            REPORT_MANIFEST_NAME)))
+
+
+def report_output_path(input_file: str, output_dir: str) -> str:
+    """Report path for a processed file in a batch: <output_dir>/<input stem>.html"""
+    return str(Path(output_dir) / f"{Path(input_file).stem}.html")
+
+
+def _render_batch_file(input_file: str, output_file: str, lazy_details: bool = False,
+                       virtual_table: bool = False, precompress: bool = False,
+                       page_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Render one report of a batch and describe the outcome as a manifest entry
+    """
+    entry = {"input_file": input_file, "output_file": output_file}
+    start = time.perf_counter()
+    try:
+        report = render_report_file(input_file, output_file, lazy_details=lazy_details,
+                                    virtual_table=virtual_table, precompress=precompress,
+                                    page_size=page_size, page_workers=1)
+        entry["firm_name"] = report["firm_name"]
+        entry["html_bytes"] = report["html_bytes"]
+        entry["precompressed"] = report["precompressed"]
+        if page_size:
+            entry["page_count"] = report["pages"]["page_count"]
+        entry["status"] = "ok"
+    except Exception as e:
+        entry["status"] = "failed"
+        entry["error"] = f"{type(e).__name__}: {e}"
+    entry["seconds"] = round(time.perf_counter() - start, 4)
+    return entry
+
+
+def generate_reports_batch(source: str, output_dir: str, workers: Optional[int] = None,
+                           force: bool = False, lazy_details: bool = False,
+                           virtual_table: bool = False, precompress: bool = False,
+                           page_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Render reports for every processed file matched by source into output_dir,
+    in this process or across a process pool. A file whose fingerprint matches
+    the one recorded in the report manifest (REPORT_MANIFEST_NAME) and whose
+    report still exists is skipped unless force is set. Inputs that would render
+    to the same report (acme.json and acme.pecol) are all recorded as failed
+    rather than overwriting each other.
+    """
+    input_files = find_processed_files(source)
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    manifest_path = Path(output_dir) / REPORT_MANIFEST_NAME
+    
+    previous_reports = {}
+    if manifest_path.exists():
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                previous_reports = {entry["input_file"]: entry for entry in json.load(f).get("files", [])}
+        except (ValueError, KeyError, AttributeError):
+            previous_reports = {}
+    
+    options = {"lazy_details": lazy_details, "virtual_table": virtual_table,
+               "precompress": precompress, "brotli": precompress and brotli is not None, "page_size": page_size}
+    started_at = datetime.now(timezone.utc).isoformat()
+    start = time.perf_counter()
+    
+    output_files = {input_file: report_output_path(input_file, output_dir) for input_file in input_files}
+    writers = {}
+    for input_file, output_file in output_files.items():
+        writers.setdefault(output_file, []).append(input_file)
+    
+    entries = {}
+    pending = []
+    for input_file in input_files:
+        output_file = output_files[input_file]
+        if len(writers[output_file]) > 1:
+            others = ", ".join(other for other in writers[output_file] if other != input_file)
+            entries[input_file] = {"input_file": input_file, "output_file": output_file, "status": "failed",
+                                   "error": f"{Path(output_file).name} would also be written by {others}"}
+            continue
         
-        # Generate the HTML report
-        html_report = generate_html_report(processed_data)
+        previous = previous_reports.get(input_file)
+        try:
+            fingerprint = input_fingerprint(input_file, previous and previous.get("fingerprint"), options)
+        except OSError as e:
+            entries[input_file] = {"input_file": input_file, "output_file": output_file,
+                                   "status": "failed", "error": f"{type(e).__name__}: {e}"}
+            continue
         
-        # Write the HTML file
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html_report)
+        if (not force and previous and previous.get("status") in ("ok", "skipped")
+                and same_content(previous.get("fingerprint"), fingerprint) and Path(output_file).exists()
+                and all(Path(artifact["path"]).exists() for artifact in previous.get("precompressed", []))):
+            entries[input_file] = dict(previous, status="skipped", seconds=0.0)
+            continue
+        
+        entries[input_file] = {"fingerprint": fingerprint}
+        pending.append((input_file, output_file))
+    
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending) or 1))
+    if workers == 1:
+        results = [_render_batch_file(input_file, output_file, lazy_details, virtual_table, precompress, page_size)
+                   for input_file, output_file in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_render_batch_file, input_file, output_file, lazy_details, virtual_table,
+                                   precompress, page_size)
+                       for input_file, output_file in pending]
+            results = []
+            for (input_file, output_file), future in zip(pending, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    # The worker process itself died
+                    results.append({"input_file": input_file, "output_file": output_file,
+                                    "status": "failed", "error": f"{type(e).__name__}: {e}", "seconds": None})
+    
+    for result in results:
+        result["fingerprint"] = entries[result["input_file"]]["fingerprint"]
+        entries[result["input_file"]] = result
+    
+    files = [entries[input_file] for input_file in input_files]
+    manifest = {
+        "started_at": started_at,
+        "source": source,
+        "output_dir": output_dir,
+        "workers": workers,
+        "wall_seconds": round(time.perf_counter() - start, 4),
+        "total_files": len(files),
+        "rendered": sum(1 for entry in files if entry["status"] == "ok"),
+        "skipped": sum(1 for entry in files if entry["status"] == "skipped"),
+        "failed": sum(1 for entry in files if entry["status"] == "failed"),
+        "files": files
+    }
+    
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    
+    return manifest
+
+
+def generate_report(input_file: str, output_file: str, profile: bool = False, trace_memory: bool = False,
+                    lazy_details: bool = False, virtual_table: bool = False, precompress: bool = False,
+                    page_size: Optional[int] = None, workers: Optional[int] = None) -> None:
+    """
+    Main report generation function
+    """
+    try:
+        timer = StageTimer(profile=profile, trace_memory=trace_memory)
+        with timer:
+            report = render_report_file(input_file, output_file, timer, lazy_details, virtual_table, precompress,
+                                        page_size, workers)
         
-        firm_name = processed_data["firm_name"]
-        total_companies = processed_data["summary"]["total_companies"]
-        companies_with_data = processed_data["summary"]["companies_with_data"]
+        firm_name = report["firm_name"]
+        total_companies = report["summary"]["total_companies"]
+        companies_with_data = report["summary"]["companies_with_data"]
         
         print(f"Successfully generated report for {firm_name}")
         print(f"Total companies: {total_companies}")
         print(f"Companies with data: {companies_with_data}")
         print(f"HTML report saved to: {output_file}")
+        if page_size:
+            pages = report["pages"]
+            print(f"Pages: {pages['page_count']} of up to {page_size} companies "
+                  f"({pages['rendered']} files written, {pages['skipped']} unchanged)")
+        for artifact in report["precompressed"]:
+            print(f"Precompressed ({artifact['encoding']}): {artifact['path']} - "
+                  f"{artifact['bytes']:,} of {artifact['source_bytes']:,} bytes ({artifact['ratio']}x)")
+        if precompress and brotli is None:
+            print("Brotli output skipped: install the 'brotli' package to enable it")
+        if profile or trace_memory:
+            print(f"Profile saved to: {timer.write_sidecar(output_file)}")
         
     except FileNotFoundError:
         print(f"Error: Input file '{input_file}' not found", file=sys.stderr)
@@ -441,12 +1619,68 @@ def generate_report(input_file: str, output_file: str) -> None:
 
 def main():
     parser = argparse.ArgumentParser(description="Generate HTML report from processed PE firm data")
-    parser.add_argument("input_file", help="Input processed JSON file path")
-    parser.add_argument("output_file", help="Output HTML file path")
+    parser.add_argument("input_file", help="Input processed JSON (or binary) file path (directory or glob with --batch)")
+    parser.add_argument("output_file", help="Output HTML file path (output directory with --batch)")
+    parser.add_argument("--batch", action="store_true",
+                        help="Render a report for every processed file in a directory or glob into an output directory")
+    parser.add_argument("--workers", type=int,
+                        help="Worker processes for --batch or for rendering pages (defaults to the CPU count)")
+    parser.add_argument("--force", action="store_true",
+                        help="With --batch, re-render reports even when their input is unchanged")
+    parser.add_argument("--lazy-details", action="store_true",
+                        help="Embed plan details as one compact JSON block rendered on first expand (smaller, faster to open)")
+    parser.add_argument("--precompress", action="store_true",
+                        help="Also write <output>.gz and <output>.br while rendering "
+                             "(.br needs the brotli package from requirements.txt and is skipped without it)")
+    parser.add_argument("--page-size", type=int,
+                        help="Split the report into pages of this many companies plus an index page with the summary")
+    parser.add_argument("--virtual-table", action="store_true",
+                        help="Ship companies as data and render only visible rows, with sortable columns and a name filter")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write per-stage timings and cProfile stats to <output>.profile.json and <output>.prof")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Record peak memory and top allocations (tracemalloc) in <output>.profile.json")
     
     args = parser.parse_args()
     
-    generate_report(args.input_file, args.output_file)
+    if args.page_size is not None and args.page_size < 1:
+        parser.error("--page-size must be at least 1")
+    if args.page_size and args.virtual_table:
+        parser.error("--page-size cannot be combined with --virtual-table")
+    
+    if args.batch:
+        if args.profile or args.trace_memory:
+            parser.error("--profile and --trace-memory cannot be used with --batch")
+        
+        manifest = generate_reports_batch(args.input_file, args.output_file, args.workers, force=args.force,
+                                          lazy_details=args.lazy_details, virtual_table=args.virtual_table,
+                                          precompress=args.precompress, page_size=args.page_size)
+        
+        print(f"Rendered {manifest['rendered']} reports, skipped {manifest['skipped']} unchanged "
+              f"in {manifest['wall_seconds']:.2f}s with {manifest['workers']} workers")
+        if args.precompress:
+            rendered = [entry for entry in manifest["files"] if entry["status"] == "ok"]
+            html_bytes = sum(entry["html_bytes"] for entry in rendered)
+            for encoding in ("gzip", "br"):
+                encoded_bytes = sum(artifact["bytes"] for entry in rendered for artifact in entry["precompressed"]
+                                    if artifact["encoding"] == encoding)
+                if encoded_bytes:
+                    print(f"Precompressed ({encoding}): {encoded_bytes:,} of {html_bytes:,} bytes "
+                          f"({html_bytes / encoded_bytes:.2f}x)")
+            if brotli is None:
+                print("Brotli output skipped: install the 'brotli' package to enable it")
+        for entry in manifest["files"]:
+            if entry["status"] == "failed":
+                print(f"Error: {entry['input_file']}: {entry['error']}", file=sys.stderr)
+        print(f"Manifest saved to: {Path(args.output_file) / REPORT_MANIFEST_NAME}")
+        
+        if manifest["failed"]:
+            sys.exit(1)
+        return
+    
+    generate_report(args.input_file, args.output_file, profile=args.profile, trace_memory=args.trace_memory,
+                    lazy_details=args.lazy_details, virtual_table=args.virtual_table, precompress=args.precompress,
+                    page_size=args.page_size, workers=args.workers)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Record Types for Processed PE Firm Insurance Data
+Compact slotted records shared by process_data.py and generate_report.py
+"""
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+from typing import Dict, List, Any, Optional, Tuple
+
+
+# Columnar binary interchange format for processed data (see write_processed_binary)
+BINARY_MAGIC = b"PEIRCOL1"
+BINARY_EXTENSION = ".pecol"
+
+_HEADER_LENGTH = struct.Struct("<I")
+_ALIGNMENT = 8
+
+
+def _intern(value: Any) -> Any:
+    """Intern repeated strings (carriers, benefit types, years) so records share one copy"""
+    return sys.intern(value) if type(value) is str else value
+
+
+class PlanSummary:
+    """
+    One Schedule A plan of a processed company
+    """
+
+    __slots__ = ("benefit_type", "carrier_name", "premiums", "brokerage_fees", "people_covered")
+
+    def __init__(self, benefit_type: str, carrier_name: str, premiums: float,
+                 brokerage_fees: float, people_covered: int):
+        self.benefit_type = _intern(benefit_type)
+        self.carrier_name = _intern(carrier_name)
+        self.premiums = premiums
+        self.brokerage_fees = brokerage_fees
+        self.people_covered = people_covered
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PlanSummary":
+        return cls(data["benefit_type"], data["carrier_name"], data["premiums"],
+                   data["brokerage_fees"], data["people_covered"])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "benefit_type": self.benefit_type,
+            "carrier_name": self.carrier_name,
+            "premiums": self.premiums,
+            "brokerage_fees": self.brokerage_fees,
+            "people_covered": self.people_covered
+        }
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, PlanSummary):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"PlanSummary({self.benefit_type!r}, {self.carrier_name!r}, {self.premiums!r})"
+
+
+class ProcessedCompany:
+    """
+    One company of the processed output, with its preferred-year totals and plans.
+    years holds the optional all-years rollup (per-year totals with year-over-year
+    deltas) and is omitted from the output when it was not requested.
+    """
+
+    __slots__ = ("company_name", "data_year", "has_data", "total_premiums", "total_brokerage_fees",
+                 "total_people_covered", "total_participants", "plans", "years")
+
+    def __init__(self, company_name: str, data_year: Optional[str], has_data: bool,
+                 total_premiums: float, total_brokerage_fees: float, total_people_covered: int,
+                 total_participants: int, plans: List[PlanSummary],
+                 years: Optional[List[Dict[str, Any]]] = None):
+        self.company_name = company_name
+        self.data_year = _intern(data_year)
+        self.has_data = has_data
+        self.total_premiums = total_premiums
+        self.total_brokerage_fees = total_brokerage_fees
+        self.total_people_covered = total_people_covered
+        self.total_participants = total_participants
+        self.plans = plans
+        self.years = years
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProcessedCompany":
+        return cls(
+            data["company_name"],
+            data["data_year"],
+            data["has_data"],
+            data["total_premiums"],
+            data["total_brokerage_fees"],
+            data["total_people_covered"],
+            data.get("total_participants", 0),
+            [PlanSummary.from_dict(plan) for plan in data["plans"]],
+            data.get("years")
+        )
+
+    @classmethod
+    def coerce(cls, company: Any) -> "ProcessedCompany":
+        """Accept either a record or a company dict in the processed JSON shape"""
+        return company if isinstance(company, cls) else cls.from_dict(company)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "company_name": self.company_name,
+            "data_year": self.data_year,
+            "has_data": self.has_data,
+            "total_premiums": self.total_premiums,
+            "total_brokerage_fees": self.total_brokerage_fees,
+            "total_people_covered": self.total_people_covered,
+            "total_participants": self.total_participants,
+            "plans": [plan.to_dict() for plan in self.plans]
+        }
+        if self.years is not None:
+            data["years"] = self.years
+        return data
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, ProcessedCompany):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"ProcessedCompany({self.company_name!r}, {self.data_year!r}, plans={len(self.plans)})"
+
+
+def record_to_json(value: Any) -> Dict[str, Any]:
+    """
+    json.dump(default=...) hook that serializes records in the existing processed JSON shape
+    """
+    if isinstance(value, (ProcessedCompany, PlanSummary)):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _string_table(values: List[Optional[str]], table: Dict[str, int]) -> array:
+    """Dictionary-encode strings against a shared table; None is stored as -1"""
+    codes = array('i')
+    for value in values:
+        if value is None:
+            codes.append(-1)
+            continue
+        code = table.get(value)
+        if code is None:
+            code = table[value] = len(table)
+        codes.append(code)
+    return codes
+
+
+def write_processed_binary(processed_data: Dict[str, Any], output_file: str) -> None:
+    """
+    Write processed data in the columnar binary format.
+
+    Layout: BINARY_MAGIC, a little-endian uint32 header length, a JSON header
+    (firm_name, timestamp, summary and the offset/type/length of every column),
+    then 8-byte aligned little-endian columns. Companies and plans are stored
+    column-wise; company names, years, benefit types and carriers are
+    dictionary-encoded into one shared string table.
+    """
+    companies = [ProcessedCompany.coerce(company) for company in processed_data["companies"]]
+    if any(company.years is not None for company in companies):
+        raise ValueError("The binary format does not carry the all-years rollup")
+    plans = [plan for company in companies for plan in company.plans]
+
+    strings = {}
+    plan_start = array('q', [0])
+    for company in companies:
+        plan_start.append(plan_start[-1] + len(company.plans))
+
+    columns = {
+        "company_name": _string_table([company.company_name for company in companies], strings),
+        "data_year": _string_table([company.data_year for company in companies], strings),
+        "has_data": array('B', [1 if company.has_data else 0 for company in companies]),
+        "total_premiums": array('d', [company.total_premiums for company in companies]),
+        "total_brokerage_fees": array('d', [company.total_brokerage_fees for company in companies]),
+        "total_people_covered": array('q', [company.total_people_covered for company in companies]),
+        "total_participants": array('q', [company.total_participants for company in companies]),
+        "plan_start": plan_start,
+        "benefit_type": _string_table([plan.benefit_type for plan in plans], strings),
+        "carrier_name": _string_table([plan.carrier_name for plan in plans], strings),
+        "premiums": array('d', [plan.premiums for plan in plans]),
+        "brokerage_fees": array('d', [plan.brokerage_fees for plan in plans]),
+        "people_covered": array('q', [plan.people_covered for plan in plans])
+    }
+
+    encoded_strings = [value.encode("utf-8") for value in strings]
+    string_offsets = array('q', [0])
+    for encoded in encoded_strings:
+        string_offsets.append(string_offsets[-1] + len(encoded))
+    columns["string_offsets"] = string_offsets
+    columns["string_data"] = array('B', b"".join(encoded_strings))
+
+    if sys.byteorder != "little":
+        for column in columns.values():
+            column.byteswap()
+
+    # Column offsets are relative to the aligned start of the data section
+    layout = {}
+    offset = 0
+    for name, column in columns.items():
+        layout[name] = [offset, column.typecode, len(column)]
+        offset += -(-len(column) * column.itemsize // _ALIGNMENT) * _ALIGNMENT
+
+    header = json.dumps({
+        "firm_name": processed_data["firm_name"],
+        "timestamp": processed_data.get("timestamp"),
+        "summary": processed_data["summary"],
+        "company_count": len(companies),
+        "plan_count": len(plans),
+        "columns": layout
+    }, ensure_ascii=False).encode("utf-8")
+
+    prefix_length = len(BINARY_MAGIC) + _HEADER_LENGTH.size + len(header)
+    with open(output_file, 'wb') as f:
+        f.write(BINARY_MAGIC)
+        f.write(_HEADER_LENGTH.pack(len(header)))
+        f.write(header)
+        f.write(b"\0" * (-prefix_length % _ALIGNMENT))
+        for column in columns.values():
+            column.tofile(f)
+            f.write(b"\0" * (-len(column) * column.itemsize % _ALIGNMENT))
+
+
+def is_processed_binary(input_file: str) -> bool:
+    """Whether a processed file uses the columnar binary format"""
+    with open(input_file, 'rb') as f:
+        return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+def _read_columns(buffer: Any) -> Tuple[Dict[str, Any], Dict[str, List[Any]]]:
+    """Split a memory-mapped binary file into its header and decoded column lists"""
+    if bytes(buffer[:len(BINARY_MAGIC)]) != BINARY_MAGIC:
+        raise ValueError("Not a processed binary file")
+
+    header_start = len(BINARY_MAGIC) + _HEADER_LENGTH.size
+    (header_length,) = _HEADER_LENGTH.unpack_from(buffer, len(BINARY_MAGIC))
+    header = json.loads(bytes(buffer[header_start:header_start + header_length]).decode("utf-8"))
+    data_start = header_start + header_length
+    data_start += -data_start % _ALIGNMENT
+
+    columns = {}
+    for name, (offset, typecode, length) in header["columns"].items():
+        start = data_start + offset
+        end = start + length * array(typecode).itemsize
+        if sys.byteorder == "little":
+            with buffer[start:end].cast(typecode) as view:
+                columns[name] = view.tolist() if name != "string_data" else view.tobytes()
+        else:
+            column = array(typecode)
+            column.frombytes(buffer[start:end])
+            column.byteswap()
+            columns[name] = column.tolist() if name != "string_data" else column.tobytes()
+
+    return header, columns
+
+
+def load_processed_binary(input_file: str) -> Dict[str, Any]:
+    """
+    Load a columnar binary file (memory-mapped) into the processed data
+    structure, with companies as ProcessedCompany records
+    """
+    with open(input_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as buffer:
+                header, columns = _read_columns(buffer)
+
+    string_data = columns["string_data"]
+    offsets = columns["string_offsets"]
+    strings = [sys.intern(string_data[offsets[i]:offsets[i + 1]].decode("utf-8")) for i in range(len(offsets) - 1)]
+
+    def decode(codes: List[int]) -> List[Optional[str]]:
+        return [strings[code] if code >= 0 else None for code in codes]
+
+    plans = [
+        PlanSummary(benefit_type, carrier_name, premiums, brokerage_fees, people_covered)
+        for benefit_type, carrier_name, premiums, brokerage_fees, people_covered in zip(
+            decode(columns["benefit_type"]), decode(columns["carrier_name"]),
+            columns["premiums"], columns["brokerage_fees"], columns["people_covered"]
+        )
+    ]
+
+    plan_start = columns["plan_start"]
+    companies = [
+        ProcessedCompany(company_name, data_year, bool(has_data), total_premiums, total_brokerage_fees,
+                         total_people_covered, total_participants, plans[plan_start[i]:plan_start[i + 1]])
+        for i, (company_name, data_year, has_data, total_premiums, total_brokerage_fees,
+                total_people_covered, total_participants) in enumerate(zip(
+            decode(columns["company_name"]), decode(columns["data_year"]), columns["has_data"],
+            columns["total_premiums"], columns["total_brokerage_fees"],
+            columns["total_people_covered"], columns["total_participants"]
+        ))
+    ]
+
+    return {
+        "firm_name": header["firm_name"],
+        "timestamp": header.get("timestamp"),
+        "summary": header["summary"],
+        "companies": companies
+    }
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Profiling Helpers for the PE Firm Insurance Pipeline
+Per-stage wall-clock timers with optional cProfile and tracemalloc capture,
+shared by process_data.py and generate_report.py
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Any, Iterator, Optional
+
+
+PROFILE_SIDECAR_SUFFIX = ".profile.json"
+CPROFILE_SUFFIX = ".prof"
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock time per named stage (read, parse, process, ...).
+
+    Library code records stages with `with timer.stage("parse"):` or
+    timer.add("parse", seconds); a stage entered several times accumulates.
+    With profile/trace_memory, start() and stop() also capture a cProfile run
+    and tracemalloc's top allocations for the sidecar report.
+    """
+
+    def __init__(self, profile: bool = False, trace_memory: bool = False, top_allocations: int = 25):
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.top_allocations = top_allocations
+        self.stages = {}
+        self._profiler = None
+        self._snapshot = None
+        self._peak_bytes = None
+        self._started = None
+        self._total_seconds = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float, calls: int = 1) -> None:
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = {"seconds": 0.0, "calls": 0}
+        stats["seconds"] += seconds
+        stats["calls"] += calls
+
+    def start(self) -> "StageTimer":
+        """Begin the overall run (and cProfile/tracemalloc capture when enabled)"""
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._started = time.perf_counter()
+        return self
+
+    def stop(self) -> None:
+        if self._started is not None:
+            self._total_seconds = time.perf_counter() - self._started
+        if self._profiler:
+            self._profiler.disable()
+        if self.trace_memory and tracemalloc.is_tracing():
+            self._peak_bytes = tracemalloc.get_traced_memory()[1]
+            self._snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def __enter__(self) -> "StageTimer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def report(self) -> Dict[str, Any]:
+        """Stage timings plus any captured memory and profile data, as a JSON-friendly dict"""
+        report = {
+            "stages": {
+                name: {"seconds": round(stats["seconds"], 6), "calls": stats["calls"]}
+                for name, stats in self.stages.items()
+            }
+        }
+        if self._total_seconds is not None:
+            report["total_seconds"] = round(self._total_seconds, 6)
+
+        if self._snapshot is not None:
+            report["memory"] = {
+                "peak_bytes": self._peak_bytes,
+                "top_allocations": [
+                    {
+                        "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                        "size_bytes": stat.size,
+                        "count": stat.count
+                    }
+                    for stat in self._snapshot.statistics("lineno")[:self.top_allocations]
+                ]
+            }
+
+        if self._profiler:
+            report["profile"] = self._top_functions()
+
+        return report
+
+    def write_sidecar(self, output_file: str) -> str:
+        """
+        Write the report next to output_file (<output>.profile.json), plus the raw
+        cProfile stats (<output>.prof, loadable with pstats) when profiling.
+        Returns the sidecar path.
+        """
+        sidecar = f"{output_file}{PROFILE_SIDECAR_SUFFIX}"
+        with open(sidecar, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        if self._profiler:
+            self._profiler.dump_stats(f"{output_file}{CPROFILE_SUFFIX}")
+        return sidecar
+
+    def _top_functions(self, limit: int = 30) -> List[Dict[str, Any]]:
+        stats = pstats.Stats(self._profiler, stream=io.StringIO())
+        rows = []
+        for (filename, lineno, function), (_, calls, own, cumulative, _) in stats.stats.items():
+            rows.append({
+                "function": f"{filename}:{lineno}({function})",
+                "calls": calls,
+                "own_seconds": round(own, 6),
+                "cumulative_seconds": round(cumulative, 6)
+            })
+        rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+        return rows[:limit]
+
+
+def timer_or_default(timer: Optional[StageTimer]) -> StageTimer:
+    """Library entry points take an optional timer; record into a throwaway one when none is given"""
+    return timer if timer is not None else StageTimer()
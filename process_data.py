@@ -4,12 +4,37 @@ Data Processor for PE Firm Insurance Reports
 Processes raw JSON data and applies year preferences and aggregations
 """
 
+import glob
 import json
+import os
+import re
 import sys
+import time
 import argparse
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Dict, List, Any, Optional, Iterator, TextIO
 from pathlib import Path
 
+from insurance_records import (
+    BINARY_EXTENSION, PlanSummary, ProcessedCompany, record_to_json, write_processed_binary
+)
+from pipeline_profiling import StageTimer, timer_or_default
+
+
+# Characters read per refill when streaming a research results file
+STREAM_CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r'\s*')
+
+_END_OF_COMPANIES = object()
+
+RESEARCH_RESULTS_SUFFIX = "_research_results"
+
+# Run manifest written next to the processed files of a --batch run
+BATCH_MANIFEST_NAME = "batch_manifest.json"
+
 
 def get_preferred_year(available_years: List[str]) -> Optional[str]:
     """
@@ -40,11 +65,46 @@ def get_preferred_year(available_years: List[str]) -> Optional[str]:
         return str(years[0])
 
 
+def parse_cents(value: Any) -> int:
+    """
+    Parse a monetary amount ("1540766.00", "", 12.5, ...) into integer cents without going through float
+    """
+    # Fast path for the plain "1234.56" strings Schedule A uses
+    try:
+        if value[-3] == ".":
+            return int(value.replace(".", "", 1))
+    except (TypeError, IndexError, ValueError):
+        pass
+    
+    if value is None or value == "":
+        return 0
+    if isinstance(value, int):
+        return value * 100
+    if isinstance(value, float):
+        return int(Decimal(repr(value)).scaleb(2).quantize(Decimal(1), ROUND_HALF_UP))
+    
+    text = str(value).strip()
+    if not text:
+        return 0
+    
+    # Plain amounts with fewer decimals ("1234", "1234.5")
+    whole, _, fraction = text.partition(".")
+    digits = whole.lstrip("+-")
+    if digits.isdigit() and len(whole) - len(digits) <= 1 and len(fraction) <= 2 and (not fraction or fraction.isdigit()):
+        cents = int(digits) * 100 + int(fraction.ljust(2, "0"))
+        return -cents if whole.startswith("-") else cents
+    
+    try:
+        return int(Decimal(text).scaleb(2).quantize(Decimal(1), ROUND_HALF_UP))
+    except InvalidOperation:
+        raise ValueError(f"could not convert string to amount: '{value}'")
+
+
 def aggregate_schedule_a_data(schedule_a_details: Dict[str, List[Dict]], preferred_year: str) -> Dict[str, Any]:
     """
     Aggregate Schedule A data for the preferred year
     """
-    if preferred_year not in schedule_a_details:
+    if preferred_year not in schedule_a_details or not schedule_a_details[preferred_year]:
         return {
             "total_premiums": 0,
             "total_brokerage_fees": 0,
@@ -53,37 +113,57 @@ def aggregate_schedule_a_data(schedule_a_details: Dict[str, List[Dict]], preferr
         }
     
     year_data = schedule_a_details[preferred_year]
-    total_premiums = 0
-    total_brokerage_fees = 0
+    # Money is summed as integer cents so totals are exact
+    premium_cents = 0
+    brokerage_cents = 0
     total_people_covered = 0
     plans = []
     
     for plan in year_data:
-        # Parse monetary values, handling empty strings
-        premiums = float(plan.get("totalCharges", "0") or "0")
-        brokerage = float(plan.get("brokerCommission", "0") or "0")
+        premiums = parse_cents(plan.get("totalCharges", "0"))
+        brokerage = parse_cents(plan.get("brokerCommission", "0"))
         people = int(plan.get("personsCovered", "0") or "0")
         
-        total_premiums += premiums
-        total_brokerage_fees += brokerage
+        premium_cents += premiums
+        brokerage_cents += brokerage
         total_people_covered += people
         
-        plans.append({
-            "benefit_type": plan.get("benefitType", ""),
-            "carrier_name": plan.get("carrierName", ""),
-            "premiums": premiums,
-            "brokerage_fees": brokerage,
-            "people_covered": people
-        })
+        plans.append(PlanSummary(plan.get("benefitType", ""), plan.get("carrierName", ""),
+                                 premiums / 100, brokerage / 100, people))
     
     return {
-        "total_premiums": total_premiums,
-        "total_brokerage_fees": total_brokerage_fees,
+        "total_premiums": premium_cents / 100,
+        "total_brokerage_fees": brokerage_cents / 100,
         "total_people_covered": total_people_covered,
         "plans": plans
     }
 
 
+def plan_subtotals(plans: List[PlanSummary], key: str = "benefit_type") -> Dict[str, Dict[str, Any]]:
+    """
+    Premiums, brokerage fees, people covered and plan count per distinct value of
+    a plan field ("benefit_type" or "carrier_name"), largest premiums first.
+    Money is summed as integer cents, like aggregate_schedule_a_data's totals.
+    """
+    groups = {}
+    for plan in plans:
+        group_key = getattr(plan, key)
+        group = groups.get(group_key)
+        if group is None:
+            group = groups[group_key] = [0, 0, 0, 0]
+        group[0] += round(plan.premiums * 100)
+        group[1] += round(plan.brokerage_fees * 100)
+        group[2] += plan.people_covered
+        group[3] += 1
+    
+    return {
+        group_key: {"premiums": premium_cents / 100, "brokerage_fees": brokerage_cents / 100,
+                    "people_covered": people_covered, "plans": plan_count}
+        for group_key, (premium_cents, brokerage_cents, people_covered, plan_count)
+        in sorted(groups.items(), key=lambda item: -item[1][0])
+    }
+
+
 def get_total_participants(form5500_records: Dict[str, List[Dict]], preferred_year: str) -> int:
     """
     Get total active participants for the preferred year from Form 5500 data
@@ -102,9 +182,142 @@ def get_total_participants(form5500_records: Dict[str, List[Dict]], preferred_ye
     return total_participants
 
 
-def process_company_data(company: Dict[str, Any]) -> Dict[str, Any]:
+def year_changes(previous: Dict[str, Any], totals: Dict[str, Any], from_year: str) -> Dict[str, Any]:
+    """
+    Deltas between two sets of totals; premiums_pct is None when the previous totals had no premiums
+    """
+    return {
+        "from_year": from_year,
+        "premiums": round(totals["total_premiums"] - previous["total_premiums"], 2),
+        "premiums_pct": (round((totals["total_premiums"] - previous["total_premiums"])
+                               / previous["total_premiums"] * 100, 2)
+                         if previous["total_premiums"] else None),
+        "brokerage_fees": round(totals["total_brokerage_fees"] - previous["total_brokerage_fees"], 2),
+        "people_covered": totals["total_people_covered"] - previous["total_people_covered"],
+        "participants": totals["total_participants"] - previous["total_participants"]
+    }
+
+
+def year_over_year(year_totals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Add year-over-year deltas to per-year totals sorted oldest first.
+    Each entry gains a "changes" block relative to the previous year in the list
+    (None for the first year, and when either year has no Schedule A data, since
+    its zero premiums would read as a drop rather than a gap in the filings).
+    """
+    previous = None
+    for totals in year_totals:
+        if previous is not None and previous["has_data"] and totals["has_data"]:
+            totals["changes"] = year_changes(previous, totals, previous["year"])
+        else:
+            totals["changes"] = None
+        previous = totals
+    return year_totals
+
+
+def aggregate_all_years(schedule_a_details: Dict[str, List[Dict]], form5500_records: Dict[str, List[Dict]],
+                        known: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    Per-year totals for every year found in Schedule A details or Form 5500 records,
+    oldest first, with year-over-year deltas. known maps years already aggregated
+    (the preferred year) to their aggregate_schedule_a_data result so they are not redone.
+    """
+    known = known or {}
+    years = sorted(set(schedule_a_details) | set(form5500_records), key=lambda year: (len(year), year))
+    
+    year_totals = []
+    for year in years:
+        aggregated_data = known.get(year) or aggregate_schedule_a_data(schedule_a_details, year)
+        year_totals.append({
+            "year": year,
+            "has_data": bool(schedule_a_details.get(year)),
+            "total_premiums": aggregated_data["total_premiums"],
+            "total_brokerage_fees": aggregated_data["total_brokerage_fees"],
+            "total_people_covered": aggregated_data["total_people_covered"],
+            "total_participants": get_total_participants(form5500_records, year),
+            "plan_count": len(aggregated_data["plans"])
+        })
+    
+    return year_over_year(year_totals)
+
+
+_PORTFOLIO_FIELDS = ("total_premiums", "total_brokerage_fees", "total_people_covered", "total_participants")
+
+
+def _matched_totals() -> Dict[str, Any]:
+    """Empty totals of the companies present in two consecutive portfolio years"""
+    return {
+        "companies": 0,
+        "previous": dict.fromkeys(_PORTFOLIO_FIELDS, 0),
+        "current": dict.fromkeys(_PORTFOLIO_FIELDS, 0)
+    }
+
+
+def add_portfolio_years(portfolio_years: Dict[str, Dict[str, Any]], company: ProcessedCompany) -> None:
+    """
+    Fold one company's all-years rollup into running portfolio totals keyed by year.
+    Each year also keeps, per previous year, the totals of the companies with
+    Schedule A data in both years, which summarize_portfolio_years compares.
+    """
+    previous = None
+    for totals in company.years or []:
+        rollup = portfolio_years.get(totals["year"])
+        if rollup is None:
+            rollup = portfolio_years[totals["year"]] = {
+                "year": totals["year"],
+                "companies_with_data": 0,
+                "total_premiums": 0,
+                "total_brokerage_fees": 0,
+                "total_people_covered": 0,
+                "total_participants": 0,
+                "matched": {}
+            }
+        if totals["has_data"]:
+            rollup["companies_with_data"] += 1
+        for field in _PORTFOLIO_FIELDS:
+            rollup[field] += totals[field]
+        
+        if previous is not None and previous["has_data"] and totals["has_data"]:
+            matched = rollup["matched"].get(previous["year"])
+            if matched is None:
+                matched = rollup["matched"][previous["year"]] = _matched_totals()
+            matched["companies"] += 1
+            for field in _PORTFOLIO_FIELDS:
+                matched["previous"][field] += previous[field]
+                matched["current"][field] += totals[field]
+        previous = totals
+
+
+def summarize_portfolio_years(portfolio_years: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
-    Process individual company data
+    Portfolio per-year totals, oldest first, with year-over-year deltas.
+    The companies in a portfolio differ from year to year, so the deltas (and
+    premiums_pct) compare only the companies with Schedule A data in both years;
+    "companies" in the changes block is how many that was. The yearly totals
+    themselves still cover every company.
+    """
+    year_totals = [portfolio_years[year] for year in sorted(portfolio_years, key=lambda year: (len(year), year))]
+    
+    previous_year = None
+    for rollup in year_totals:
+        rollup["total_premiums"] = round(rollup["total_premiums"], 2)
+        rollup["total_brokerage_fees"] = round(rollup["total_brokerage_fees"], 2)
+        
+        matched = rollup.pop("matched").get(previous_year) or _matched_totals()
+        if previous_year is None:
+            rollup["changes"] = None
+        else:
+            rollup["changes"] = year_changes(matched["previous"], matched["current"], previous_year)
+            rollup["changes"]["companies"] = matched["companies"]
+        previous_year = rollup["year"]
+    return year_totals
+
+
+def process_company_record(company: Dict[str, Any], all_years: bool = False) -> ProcessedCompany:
+    """
+    Process individual company data into a ProcessedCompany record.
+    With all_years, every year in scheduleA.details and form5500.records is also
+    aggregated into the company's "years" rollup alongside the preferred-year view.
     """
     company_name = company.get("companyName", "Unknown Company")
     
@@ -140,16 +353,48 @@ def process_company_data(company: Dict[str, Any]) -> Dict[str, Any]:
     form5500_records = company.get("form5500", {}).get("records", {})
     total_participants = get_total_participants(form5500_records, preferred_year) if preferred_year else 0
     
-    return {
-        "company_name": company_name,
-        "data_year": preferred_year,
-        "has_data": has_data,
-        "total_premiums": aggregated_data["total_premiums"],
-        "total_brokerage_fees": aggregated_data["total_brokerage_fees"],
-        "total_people_covered": aggregated_data["total_people_covered"],
-        "total_participants": total_participants,
-        "plans": aggregated_data["plans"]
-    }
+    years = None
+    if all_years:
+        years = aggregate_all_years(schedule_a_details, form5500_records,
+                                    {preferred_year: aggregated_data} if has_data else None)
+    
+    return ProcessedCompany(
+        company_name,
+        preferred_year,
+        has_data,
+        aggregated_data["total_premiums"],
+        aggregated_data["total_brokerage_fees"],
+        aggregated_data["total_people_covered"],
+        total_participants,
+        aggregated_data["plans"],
+        years
+    )
+
+
+def process_company_data(company: Dict[str, Any], all_years: bool = False) -> Dict[str, Any]:
+    """
+    Process individual company data into a company dict in the processed JSON shape
+    """
+    return process_company_record(company, all_years).to_dict()
+
+
+def get_most_recent_year(years_found: set) -> str:
+    """
+    Pick the summary year from the data years of all processed companies
+    """
+    most_recent_year = "2023"  # Default based on our preference logic
+    
+    if years_found:
+        # Get the most recent year that's not 2024, or 2024 if it's all we have
+        sorted_years = sorted(years_found, reverse=True)
+        if "2023" in years_found:
+            most_recent_year = "2023"
+        elif "2022" in years_found:
+            most_recent_year = "2022"
+        else:
+            most_recent_year = sorted_years[0]
+    
+    return most_recent_year
 
 
 def extract_firm_name(json_file_path: str) -> str:
@@ -158,73 +403,334 @@ def extract_firm_name(json_file_path: str) -> str:
     """
     file_stem = Path(json_file_path).stem
     # Remove common suffixes and convert to title case
-    firm_name = file_stem.replace("_research_results", "").replace("_", " ").title()
+    firm_name = file_stem.replace(RESEARCH_RESULTS_SUFFIX, "").replace("_", " ").title()
     return firm_name
 
 
-def process_pe_data(input_file: str, output_file: str, firm_name: Optional[str] = None) -> None:
+class _JSONStream:
     """
-    Main processing function
+    Incremental reader that pulls one JSON value at a time out of a text file
     """
-    try:
-        # Load the raw JSON data
-        with open(input_file, 'r', encoding='utf-8') as f:
-            raw_data = json.load(f)
-        
-        # Extract firm name if not provided
-        if not firm_name:
-            firm_name = extract_firm_name(input_file)
+    
+    def __init__(self, f: TextIO, chunk_size: int = STREAM_CHUNK_SIZE):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+    
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer, dropping everything already consumed"""
+        if self._eof:
+            return False
+        chunk = self._f.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+    
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it ('' at end of file)"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+    
+    def expect(self, char: str) -> None:
+        """Consume a structural character, failing if something else comes next"""
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self._buf, self._pos)
+        self._pos += 1
+    
+    def value(self) -> Any:
+        """Decode and consume the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # The value may just be cut off at the end of the buffer
+                if self._fill():
+                    continue
+                raise
+            # A number ending exactly at the buffer edge may continue in the next chunk
+            if end == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+
+def iter_raw_companies(input_file: str, metadata: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the raw companies of a research results file one at a time.
+    Every other top-level field (timestamp, summary, ...) is stored in metadata as it is
+    reached, so it is only complete once the iterator is exhausted.
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        stream = _JSONStream(f)
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
         
-        # Process each company
-        processed_companies = []
-        companies_with_data = 0
+        while True:
+            key = stream.value()
+            stream.expect(":")
+            
+            if key == "companies":
+                stream.expect("[")
+                if stream.peek() == "]":
+                    stream.expect("]")
+                else:
+                    while True:
+                        yield stream.value()
+                        if stream.peek() == ",":
+                            stream.expect(",")
+                            continue
+                        stream.expect("]")
+                        break
+            else:
+                metadata[key] = stream.value()
+            
+            if stream.peek() == ",":
+                stream.expect(",")
+                continue
+            stream.expect("}")
+            break
+
+
+def process_pe_data_streaming(input_file: str, output_file: str, firm_name: Optional[str] = None,
+                              ndjson: bool = False,
+                              timer: Optional[StageTimer] = None,
+                              all_years: bool = False) -> Dict[str, Any]:
+    """
+    Streaming variant of the processing step for very large research results files.
+    Companies are parsed, processed and written one at a time and the summary is built
+    from running counters, so memory does not grow with the number of companies.
+    
+    JSON output has the usual fields, with "timestamp" and "summary" written after
+    "companies". NDJSON output has one processed company per line followed by a final
+    line holding "firm_name", "timestamp" and "summary".
+    
+    Reading is interleaved with parsing here, so the timer records both under "parse".
+    """
+    if not firm_name:
+        firm_name = extract_firm_name(input_file)
+    
+    timer = timer_or_default(timer)
+    clock = time.perf_counter
+    metadata = {}
+    total_companies = 0
+    companies_with_data = 0
+    years_found = set()
+    portfolio_years = {}
+    
+    with open(output_file, 'w', encoding='utf-8') as out:
+        if not ndjson:
+            out.write('{\n  "firm_name": ' + json.dumps(firm_name, ensure_ascii=False) + ',\n  "companies": [')
         
-        for company in raw_data.get("companies", []):
-            processed_company = process_company_data(company)
-            processed_companies.append(processed_company)
+        companies = iter_raw_companies(input_file, metadata)
+        while True:
+            started = clock()
+            company = next(companies, _END_OF_COMPANIES)
+            parsed = clock()
+            timer.add("parse", parsed - started)
+            if company is _END_OF_COMPANIES:
+                break
+            
+            processed_company = process_company_record(company, all_years)
+            if all_years:
+                add_portfolio_years(portfolio_years, processed_company)
+            processed = clock()
+            timer.add("process", processed - parsed)
+            
+            if ndjson:
+                company_json = json.dumps(processed_company.to_dict(), ensure_ascii=False) + "\n"
+            else:
+                company_json = json.dumps(processed_company.to_dict(), indent=2, ensure_ascii=False)
+                company_json = (",\n    " if total_companies else "\n    ") + company_json.replace("\n", "\n    ")
+            serialized = clock()
+            timer.add("serialize", serialized - processed)
+            
+            out.write(company_json)
+            timer.add("write", clock() - serialized)
             
-            if processed_company["has_data"]:
+            total_companies += 1
+            if processed_company.has_data:
                 companies_with_data += 1
+            if processed_company.data_year:
+                years_found.add(processed_company.data_year)
         
-        # Calculate summary statistics
-        total_companies = len(processed_companies)
-        most_recent_year = "2023"  # Default based on our preference logic
-        
-        # Check what years we actually have
-        years_found = set()
-        for company in processed_companies:
-            if company["data_year"]:
-                years_found.add(company["data_year"])
-        
-        if years_found:
-            # Get the most recent year that's not 2024, or 2024 if it's all we have
-            sorted_years = sorted(years_found, reverse=True)
-            if "2023" in years_found:
-                most_recent_year = "2023"
-            elif "2022" in years_found:
-                most_recent_year = "2022"
-            else:
-                most_recent_year = sorted_years[0]
-        
-        # Create the processed data structure
-        processed_data = {
-            "firm_name": firm_name,
-            "timestamp": raw_data.get("timestamp"),
-            "summary": {
-                "total_companies": total_companies,
-                "companies_with_data": companies_with_data,
-                "most_recent_year": most_recent_year
-            },
-            "companies": processed_companies
+        summary = {
+            "total_companies": total_companies,
+            "companies_with_data": companies_with_data,
+            "most_recent_year": get_most_recent_year(years_found)
         }
+        if all_years:
+            summary["years"] = summarize_portfolio_years(portfolio_years)
         
-        # Write the processed data
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(processed_data, f, indent=2, ensure_ascii=False)
+        if ndjson:
+            out.write(json.dumps({
+                "firm_name": firm_name,
+                "timestamp": metadata.get("timestamp"),
+                "summary": summary
+            }, ensure_ascii=False) + "\n")
+        else:
+            out.write("\n  ],\n" if total_companies else "],\n")
+            out.write('  "timestamp": ' + json.dumps(metadata.get("timestamp"), ensure_ascii=False) + ',\n')
+            out.write('  "summary": ' + json.dumps(summary, indent=2).replace("\n", "\n  ") + '\n}')
+    
+    return summary
+
+
+def build_processed_data(raw_data: Dict[str, Any], firm_name: str,
+                         timer: Optional[StageTimer] = None,
+                         all_years: bool = False) -> Dict[str, Any]:
+    """
+    Build the processed data structure for a fully loaded research results document.
+    Companies are ProcessedCompany records; serialize with json.dump(default=record_to_json).
+    With all_years, each company carries its per-year rollup and the summary gains
+    portfolio per-year totals ("years").
+    """
+    # Process each company
+    processed_companies = []
+    companies_with_data = 0
+    started = time.perf_counter()
+    
+    portfolio_years = {}
+    
+    for company in raw_data.get("companies", []):
+        processed_company = process_company_record(company, all_years)
+        processed_companies.append(processed_company)
+        if all_years:
+            add_portfolio_years(portfolio_years, processed_company)
+        
+        if processed_company.has_data:
+            companies_with_data += 1
+    
+    # Calculate summary statistics
+    total_companies = len(processed_companies)
+    if timer is not None:
+        timer.add("process", time.perf_counter() - started, calls=total_companies)
+    
+    # Check what years we actually have
+    years_found = set()
+    for company in processed_companies:
+        if company.data_year:
+            years_found.add(company.data_year)
+    
+    most_recent_year = get_most_recent_year(years_found)
+    
+    summary = {
+        "total_companies": total_companies,
+        "companies_with_data": companies_with_data,
+        "most_recent_year": most_recent_year
+    }
+    if all_years:
+        summary["years"] = summarize_portfolio_years(portfolio_years)
+    
+    # Create the processed data structure
+    return {
+        "firm_name": firm_name,
+        "timestamp": raw_data.get("timestamp"),
+        "summary": summary,
+        "companies": processed_companies
+    }
+
+
+def process_pe_file(input_file: str, output_file: str, firm_name: Optional[str] = None,
+                    stream: bool = False, ndjson: bool = False,
+                    output_format: str = "json",
+                    timer: Optional[StageTimer] = None,
+                    all_years: bool = False) -> Dict[str, Any]:
+    """
+    Process one research results file and return its summary block.
+    Errors are raised to the caller rather than terminating the interpreter.
+    output_format is "json" (default) or "binary" for the columnar format in insurance_records.
+    Per-stage timings (read, parse, process, serialize, write) are recorded into timer.
+    """
+    if output_format == "binary" and (stream or ndjson):
+        raise ValueError("The binary format is written column-wise and cannot be streamed")
+    if output_format == "binary" and all_years:
+        raise ValueError("The binary format does not carry the all-years rollup")
+    
+    timer = timer_or_default(timer)
+    
+    if stream or ndjson:
+        return process_pe_data_streaming(input_file, output_file, firm_name, ndjson=ndjson,
+                                         timer=timer, all_years=all_years)
+    
+    # Load the raw JSON data
+    raw_data = load_research_results(input_file, timer)
+    
+    # Extract firm name if not provided
+    if not firm_name:
+        firm_name = extract_firm_name(input_file)
+    
+    processed_data = build_processed_data(raw_data, firm_name, timer, all_years)
+    
+    # Write the processed data
+    write_processed_data(processed_data, output_file, output_format, timer)
+    
+    return processed_data["summary"]
+
+
+def load_research_results(input_file: str, timer: Optional[StageTimer] = None) -> Dict[str, Any]:
+    """
+    Read and parse one research results file, recording the read and parse stages into timer.
+    """
+    timer = timer_or_default(timer)
+    
+    with timer.stage("read"):
+        with open(input_file, 'r', encoding='utf-8') as f:
+            raw_text = f.read()
+    with timer.stage("parse"):
+        raw_data = json.loads(raw_text)
+    del raw_text
+    
+    return raw_data
+
+
+def write_processed_data(processed_data: Dict[str, Any], output_file: str, output_format: str = "json",
+                         timer: Optional[StageTimer] = None) -> None:
+    """
+    Write a processed data block as indented JSON (serialize and write stages)
+    or, with output_format "binary", in the columnar format (a single write stage).
+    """
+    timer = timer_or_default(timer)
+    
+    if output_format == "binary":
+        with timer.stage("write"):
+            write_processed_binary(processed_data, output_file)
+    else:
+        with timer.stage("serialize"):
+            processed_json = json.dumps(processed_data, indent=2, ensure_ascii=False, default=record_to_json)
+        with timer.stage("write"):
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(processed_json)
+
+
+def process_pe_data(input_file: str, output_file: str, firm_name: Optional[str] = None,
+                    stream: bool = False, ndjson: bool = False, output_format: str = "json",
+                    profile: bool = False, trace_memory: bool = False, all_years: bool = False) -> None:
+    """
+    Main processing function
+    """
+    try:
+        timer = StageTimer(profile=profile, trace_memory=trace_memory)
+        with timer:
+            summary = process_pe_file(input_file, output_file, firm_name, stream=stream, ndjson=ndjson,
+                                      output_format=output_format, timer=timer, all_years=all_years)
         
-        print(f"Successfully processed {total_companies} companies")
-        print(f"Companies with cost data: {companies_with_data}")
+        print(f"Successfully processed {summary['total_companies']} companies")
+        print(f"Companies with cost data: {summary['companies_with_data']}")
         print(f"Output saved to: {output_file}")
+        if profile or trace_memory:
+            print(f"Profile saved to: {timer.write_sidecar(output_file)}")
         
     except FileNotFoundError:
         print(f"Error: Input file '{input_file}' not found", file=sys.stderr)
@@ -237,15 +743,288 @@ def process_pe_data(input_file: str, output_file: str, firm_name: Optional[str]
         sys.exit(1)
 
 
+def find_research_files(source: str) -> List[str]:
+    """
+    Resolve a directory (all *_research_results.json inside it) or a glob pattern to input files
+    """
+    if Path(source).is_dir():
+        return sorted(str(path) for path in Path(source).glob(f"*{RESEARCH_RESULTS_SUFFIX}.json"))
+    return sorted(glob.glob(source))
+
+
+def batch_output_path(input_file: str, output_dir: str, ndjson: bool = False, output_format: str = "json") -> str:
+    """
+    Output path for one firm's processed file inside a batch output directory
+    """
+    stem = Path(input_file).stem.replace(RESEARCH_RESULTS_SUFFIX, "")
+    if output_format == "binary":
+        extension = BINARY_EXTENSION
+    else:
+        extension = ".ndjson" if ndjson else ".json"
+    return str(Path(output_dir) / f"{stem}_processed{extension}")
+
+
+def _process_batch_file(input_file: str, output_file: str, stream: bool, ndjson: bool,
+                        output_format: str = "json",
+                        profile: bool = False, trace_memory: bool = False,
+                        all_years: bool = False) -> Dict[str, Any]:
+    """
+    Process one file of a batch and describe the outcome as a manifest entry
+    """
+    entry = {
+        "input_file": input_file,
+        "output_file": output_file,
+        "firm_name": extract_firm_name(input_file)
+    }
+    start = time.perf_counter()
+    
+    timer = StageTimer(profile=profile, trace_memory=trace_memory)
+    try:
+        with timer:
+            entry["summary"] = process_pe_file(input_file, output_file, entry["firm_name"],
+                                               stream=stream, ndjson=ndjson,
+                                               output_format=output_format, timer=timer,
+                                               all_years=all_years)
+        entry["status"] = "ok"
+        if profile or trace_memory:
+            entry["profile_file"] = timer.write_sidecar(output_file)
+    except Exception as e:
+        entry["status"] = "failed"
+        entry["error"] = f"{type(e).__name__}: {e}"
+    
+    entry["seconds"] = round(time.perf_counter() - start, 4)
+    entry["stages"] = timer.report()["stages"]
+    return entry
+
+
+def process_pe_batch(source: str, output_dir: str, workers: Optional[int] = None,
+                     stream: bool = False, ndjson: bool = False,
+                     output_format: str = "json",
+                     profile: bool = False, trace_memory: bool = False,
+                     all_years: bool = False) -> Dict[str, Any]:
+    """
+    Process every research results file matched by source in a process pool.
+    Writes one processed file per firm plus a run manifest (BATCH_MANIFEST_NAME) in
+    output_dir; a failing file is recorded in the manifest and does not stop the batch.
+    Inputs that would write the same output file (same stem from different
+    directories) are all recorded as failed instead of overwriting each other.
+    Each manifest entry carries its stage timings; with profile/trace_memory a
+    profile sidecar is also written next to each output.
+    """
+    input_files = find_research_files(source)
+    output_files = [batch_output_path(input_file, output_dir, ndjson, output_format) for input_file in input_files]
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    
+    writers = {}
+    for input_file, output_file in zip(input_files, output_files):
+        writers.setdefault(output_file, []).append(input_file)
+    
+    entries = {}
+    jobs = []
+    for input_file, output_file in zip(input_files, output_files):
+        if len(writers[output_file]) > 1:
+            others = ", ".join(other for other in writers[output_file] if other != input_file)
+            entries[input_file] = {
+                "input_file": input_file,
+                "output_file": output_file,
+                "firm_name": extract_firm_name(input_file),
+                "status": "failed",
+                "error": f"{Path(output_file).name} would also be written by {others}",
+                "seconds": None
+            }
+        else:
+            jobs.append((input_file, output_file))
+    
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    started_at = datetime.now(timezone.utc).isoformat()
+    start = time.perf_counter()
+    
+    if workers == 1:
+        for input_file, output_file in jobs:
+            entries[input_file] = _process_batch_file(input_file, output_file, stream, ndjson, output_format,
+                                                      profile, trace_memory, all_years)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_process_batch_file, input_file, output_file, stream, ndjson,
+                                   output_format, profile, trace_memory, all_years)
+                       for input_file, output_file in jobs]
+            for (input_file, output_file), future in zip(jobs, futures):
+                try:
+                    entries[input_file] = future.result()
+                except Exception as e:
+                    # The worker process itself died (e.g. killed for memory)
+                    entries[input_file] = {
+                        "input_file": input_file,
+                        "output_file": output_file,
+                        "firm_name": extract_firm_name(input_file),
+                        "status": "failed",
+                        "error": f"{type(e).__name__}: {e}",
+                        "seconds": None
+                    }
+    entries = [entries[input_file] for input_file in input_files]
+    
+    failed = [entry for entry in entries if entry["status"] != "ok"]
+    manifest = {
+        "started_at": started_at,
+        "source": source,
+        "output_dir": output_dir,
+        "workers": workers,
+        "wall_seconds": round(time.perf_counter() - start, 4),
+        "total_files": len(entries),
+        "succeeded": len(entries) - len(failed),
+        "failed": len(failed),
+        "files": entries
+    }
+    
+    with open(Path(output_dir) / BATCH_MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    
+    return manifest
+
+
+def handle_worker_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Answer one worker request.
+    
+    A request carries either "data" (an inline research results document) or
+    "input_file" (a path to one), plus optional "id", "firm_name", "output_file",
+    "format" and "all_years". With "output_file" the processed data is written there and only
+    the summary is returned; otherwise the full processed data is returned inline.
+    """
+    firm_name = request.get("firm_name")
+    output_file = request.get("output_file")
+    output_format = request.get("format", "json")
+    
+    if "data" in request:
+        raw_data = request["data"]
+        firm_name = firm_name or "Unknown Firm"
+    elif "input_file" in request:
+        with open(request["input_file"], 'r', encoding='utf-8') as f:
+            raw_data = json.load(f)
+        firm_name = firm_name or extract_firm_name(request["input_file"])
+    else:
+        raise ValueError("Request needs either 'data' or 'input_file'")
+    
+    processed_data = build_processed_data(raw_data, firm_name, all_years=bool(request.get("all_years")))
+    
+    response = {"id": request.get("id"), "ok": True}
+    if output_file:
+        if output_format == "binary":
+            write_processed_binary(processed_data, output_file)
+        else:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(processed_data, f, indent=2, ensure_ascii=False, default=record_to_json)
+        response["output_file"] = output_file
+        response["summary"] = processed_data["summary"]
+    else:
+        processed_data["companies"] = [company.to_dict() for company in processed_data["companies"]]
+        response["result"] = processed_data
+    return response
+
+
+def serve_worker(input_stream: TextIO, output_stream: TextIO) -> int:
+    """
+    Resident worker loop: read one JSON request per line and write one JSON
+    response per line until end of input. Failures are answered with
+    {"ok": false, "error": ...} and the worker keeps serving.
+    Returns the number of requests handled.
+    """
+    handled = 0
+    for line in iter(input_stream.readline, ""):
+        if not line.strip():
+            continue
+        
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            request_id = request.get("id")
+            response = handle_worker_request(request)
+        except Exception as e:
+            response = {
+                "id": request_id,
+                "ok": False,
+                "error": str(e),
+                "error_type": type(e).__name__
+            }
+        
+        output_stream.write(json.dumps(response, ensure_ascii=False) + "\n")
+        output_stream.flush()
+        handled += 1
+    
+    return handled
+
+
 def main():
     parser = argparse.ArgumentParser(description="Process PE firm insurance data from raw JSON")
-    parser.add_argument("input_file", help="Input JSON file path")
-    parser.add_argument("output_file", help="Output processed JSON file path")
+    parser.add_argument("input_file", nargs="?", help="Input JSON file path (directory or glob with --batch)")
+    parser.add_argument("output_file", nargs="?",
+                        help="Output processed JSON file path (output directory with --batch)")
     parser.add_argument("--firm-name", help="Override firm name (defaults to filename-based)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Process companies one at a time to keep memory flat on very large inputs")
+    parser.add_argument("--ndjson", action="store_true",
+                        help="Write one processed company per line, summary last (implies --stream)")
+    parser.add_argument("--batch", action="store_true",
+                        help="Process every *_research_results.json in a directory or glob into an output directory")
+    parser.add_argument("--workers", type=int, help="Worker processes for --batch (defaults to the CPU count)")
+    parser.add_argument("--format", dest="output_format", choices=["json", "binary"], default="json",
+                        help="Output format; binary is the compact columnar format generate_report also reads")
+    parser.add_argument("--worker", action="store_true",
+                        help="Stay resident and answer JSON-line requests on stdin with JSON-line responses on stdout")
+    parser.add_argument("--all-years", action="store_true",
+                        help="Also aggregate every available year into per-year totals with year-over-year deltas")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write per-stage timings and cProfile stats to <output>.profile.json and <output>.prof")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Record peak memory and top allocations (tracemalloc) in <output>.profile.json")
     
     args = parser.parse_args()
     
-    process_pe_data(args.input_file, args.output_file, args.firm_name)
+    if not args.worker and not (args.input_file and args.output_file):
+        parser.error("input_file and output_file are required unless --worker is used")
+    
+    if args.output_format == "binary" and (args.stream or args.ndjson):
+        parser.error("--format binary cannot be combined with --stream or --ndjson")
+    if args.output_format == "binary" and args.all_years:
+        parser.error("--format binary cannot be combined with --all-years")
+    
+    if args.worker and (args.profile or args.trace_memory):
+        parser.error("--profile and --trace-memory cannot be used with --worker")
+    
+    if args.worker:
+        try:
+            serve_worker(sys.stdin, sys.stdout)
+        except BrokenPipeError:
+            # The client went away; point stdout at devnull so the exit-time flush stays quiet
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return
+    
+    if args.batch:
+        if args.firm_name:
+            parser.error("--firm-name cannot be used with --batch")
+        
+        manifest = process_pe_batch(args.input_file, args.output_file, args.workers,
+                                    stream=args.stream, ndjson=args.ndjson,
+                                    output_format=args.output_format,
+                                    profile=args.profile, trace_memory=args.trace_memory,
+                                    all_years=args.all_years)
+        
+        print(f"Processed {manifest['succeeded']} of {manifest['total_files']} files "
+              f"in {manifest['wall_seconds']:.2f}s with {manifest['workers']} workers")
+        for entry in manifest["files"]:
+            if entry["status"] != "ok":
+                print(f"Error: {entry['input_file']}: {entry['error']}", file=sys.stderr)
+        print(f"Manifest saved to: {Path(args.output_file) / BATCH_MANIFEST_NAME}")
+        
+        if manifest["failed"]:
+            sys.exit(1)
+        return
+    
+    process_pe_data(args.input_file, args.output_file, args.firm_name, stream=args.stream, ndjson=args.ndjson,
+                    output_format=args.output_format,
+                    profile=args.profile, trace_memory=args.trace_memory, all_years=args.all_years)
 
 
 if __name__ == "__main__":
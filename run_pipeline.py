@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+PE Firm Insurance Pipeline Runner
+Processes a research results file and renders its HTML report in one process,
+handing the processed data to the renderer in memory instead of through a
+processed JSON file on disk
+"""
+
+import json
+import sys
+import argparse
+from typing import Dict, Any, Optional
+
+from generate_report import brotli, render_processed_data
+from pipeline_profiling import StageTimer, timer_or_default
+from process_data import build_processed_data, extract_firm_name, load_research_results, write_processed_data
+
+
+def run_pipeline_file(input_file: str, output_file: str, firm_name: Optional[str] = None,
+                      processed_file: Optional[str] = None, processed_format: str = "json",
+                      all_years: bool = False,
+                      timer: Optional[StageTimer] = None, lazy_details: bool = False,
+                      virtual_table: bool = False, precompress: bool = False,
+                      page_size: Optional[int] = None, page_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Process one research results file and render its report to output_file.
+    The processed data is only serialized when processed_file is given (as JSON,
+    or the columnar format with processed_format "binary").
+    Stages (read, parse, process, [serialize, write], render) are recorded into timer.
+    Errors are raised to the caller. Returns the render_processed_data dict.
+    """
+    if processed_file and processed_format == "binary" and all_years:
+        raise ValueError("The binary format does not carry the all-years rollup")
+    if page_size and virtual_table:
+        raise ValueError("Paginated reports cannot use the virtual table")
+
+    timer = timer_or_default(timer)
+
+    raw_data = load_research_results(input_file, timer)
+
+    if not firm_name:
+        firm_name = extract_firm_name(input_file)
+
+    processed_data = build_processed_data(raw_data, firm_name, timer, all_years)
+    del raw_data
+
+    if processed_file:
+        write_processed_data(processed_data, processed_file, processed_format, timer)
+
+    return render_processed_data(processed_data, output_file, timer, lazy_details, virtual_table,
+                                 precompress, page_size, page_workers)
+
+
+def run_pipeline(input_file: str, output_file: str, firm_name: Optional[str] = None,
+                 processed_file: Optional[str] = None, processed_format: str = "json",
+                 all_years: bool = False, profile: bool = False, trace_memory: bool = False,
+                 lazy_details: bool = False, virtual_table: bool = False, precompress: bool = False,
+                 page_size: Optional[int] = None, workers: Optional[int] = None) -> None:
+    """
+    Main pipeline function
+    """
+    try:
+        timer = StageTimer(profile=profile, trace_memory=trace_memory)
+        with timer:
+            report = run_pipeline_file(input_file, output_file, firm_name, processed_file, processed_format,
+                                       all_years, timer, lazy_details, virtual_table, precompress,
+                                       page_size, workers)
+
+        summary = report["summary"]
+        print(f"Successfully generated report for {report['firm_name']}")
+        print(f"Total companies: {summary['total_companies']}")
+        print(f"Companies with data: {summary['companies_with_data']}")
+        if processed_file:
+            print(f"Processed data saved to: {processed_file}")
+        print(f"HTML report saved to: {output_file}")
+        if page_size:
+            pages = report["pages"]
+            print(f"Pages: {pages['page_count']} of up to {page_size} companies "
+                  f"({pages['rendered']} files written, {pages['skipped']} unchanged)")
+        for artifact in report["precompressed"]:
+            print(f"Precompressed ({artifact['encoding']}): {artifact['path']} - "
+                  f"{artifact['bytes']:,} of {artifact['source_bytes']:,} bytes ({artifact['ratio']}x)")
+        if precompress and brotli is None:
+            print("Brotli output skipped: install the 'brotli' package to enable it")
+        stages = ", ".join(f"{name} {stats['seconds'] * 1000:.1f}ms"
+                           for name, stats in timer.report()["stages"].items())
+        print(f"Stages: {stages}")
+        if profile or trace_memory:
+            print(f"Profile saved to: {timer.write_sidecar(output_file)}")
+
+    except FileNotFoundError:
+        print(f"Error: Input file '{input_file}' not found", file=sys.stderr)
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        print(f"Error: Invalid JSON in input file: {e}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error running pipeline: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Process PE firm research data and generate its HTML report without an intermediate JSON file")
+    parser.add_argument("input_file", help="Input research results JSON file path")
+    parser.add_argument("output_file", help="Output HTML file path")
+    parser.add_argument("--firm-name", help="PE firm name (extracted from filename if not provided)")
+    parser.add_argument("--processed-output",
+                        help="Also write the processed data to this path (the file process_data.py would produce)")
+    parser.add_argument("--format", choices=("json", "binary"), default="json",
+                        help="Format of --processed-output (binary is the columnar format from insurance_records)")
+    parser.add_argument("--all-years", action="store_true",
+                        help="Aggregate every available year per company (carried in --processed-output)")
+    parser.add_argument("--lazy-details", action="store_true",
+                        help="Embed plan details as one compact JSON block rendered on first expand")
+    parser.add_argument("--virtual-table", action="store_true",
+                        help="Ship companies as data and render only visible rows, with sortable columns and a name filter")
+    parser.add_argument("--precompress", action="store_true",
+                        help="Also write <output>.gz and <output>.br while rendering "
+                             "(.br needs the brotli package from requirements.txt and is skipped without it)")
+    parser.add_argument("--page-size", type=int,
+                        help="Split the report into pages of this many companies plus an index page with the summary")
+    parser.add_argument("--workers", type=int, help="Worker processes for rendering pages (defaults to the CPU count)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write per-stage timings and cProfile stats to <output>.profile.json and <output>.prof")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Record peak memory and top allocations (tracemalloc) in <output>.profile.json")
+
+    args = parser.parse_args()
+
+    if args.page_size is not None and args.page_size < 1:
+        parser.error("--page-size must be at least 1")
+    if args.page_size and args.virtual_table:
+        parser.error("--page-size cannot be combined with --virtual-table")
+    if args.format == "binary" and args.all_years and args.processed_output:
+        parser.error("--format binary cannot be combined with --all-years")
+
+    run_pipeline(args.input_file, args.output_file, args.firm_name, args.processed_output, args.format,
+                 args.all_years, args.profile, args.trace_memory, args.lazy_details, args.virtual_table,
+                 args.precompress, args.page_size, args.workers)
+
+
+if __name__ == "__main__":
+    main()
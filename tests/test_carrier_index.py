@@ -0,0 +1,61 @@
+"""
+Carrier Index Tests
+Checks that files next to processed outputs which are not processed outputs
+are skipped rather than aborting an index build
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from carrier_index import CarrierIndex  # noqa: E402
+
+
+PROCESSED = {
+    "firm_name": "Acme Capital",
+    "timestamp": "2025-01-01T00:00:00Z",
+    "companies": [
+        {
+            "company_name": "Acme Widgets", "data_year": "2023", "has_data": True,
+            "total_premiums": 1000.0, "total_brokerage_fees": 50.0, "total_people_covered": 5,
+            "total_participants": 4,
+            "plans": [{"benefit_type": "HEALTH", "carrier_name": "Aetna Life Ins. Co.", "premiums": 1000.0,
+                       "brokerage_fees": 50.0, "people_covered": 5}],
+        }
+    ],
+}
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path.resolve())
+
+
+def test_unprocessed_json_is_skipped(tmp_path):
+    empty = write_json(tmp_path / "acme_research_results.json", {"success": True, "companies": [], "timestamp": "x"})
+    write_json(tmp_path / "zeta_processed.json", PROCESSED)
+
+    index = CarrierIndex(str(tmp_path / "index.db"))
+    stats = index.update([str(tmp_path)])
+
+    assert stats["indexed"] == 1
+    assert [entry["path"] for entry in stats["skipped"]] == [empty]
+    assert [row["company_name"] for row in index.lookup("aetna life ins co")] == ["Acme Widgets"]
+    index.close()
+
+
+def test_unreadable_replacement_drops_old_postings(tmp_path):
+    path = tmp_path / "acme_processed.json"
+    write_json(path, PROCESSED)
+    index = CarrierIndex(str(tmp_path / "index.db"))
+    index.update([str(tmp_path)])
+    assert index.lookup("aetna life ins co")
+
+    path.write_text('{"companies": []}', encoding="utf-8")
+    stats = index.update([str(tmp_path)])
+
+    assert len(stats["skipped"]) == 1
+    assert index.lookup("aetna life ins co") == []
+    index.close()
@@ -0,0 +1,100 @@
+"""
+Streaming Reader Tests
+Checks iter_raw_companies, which parses a research results file one company at a
+time, against json.loads of the whole document, with chunk boundaries falling
+at every offset (inside strings, escapes and numbers)
+"""
+
+import functools
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import process_data  # noqa: E402
+
+
+COMPANIES = [
+    {
+        "name": 'Acme "Quoted" \\ Holdings',
+        "notes": "line one\nline two\ttabbed é \U0001F600 /slash",
+        "scheduleA": {"details": {"2023": [{"totalCharges": "1540766.00", "personsCovered": "226"}]}},
+        "employees": 12345
+    },
+    {"name": "Beta, Inc.", "scheduleA": {"details": {}}, "form5500": {"records": {"2022": []}}, "score": -1.5e3},
+    {"name": "", "tags": [[], {}, [1, [2, [3]]]], "active": True, "parent": None}
+]
+
+
+def write_document(tmp_path, document, **dump_options):
+    path = tmp_path / "acme_research_results.json"
+    path.write_text(json.dumps(document, **dump_options), encoding="utf-8")
+    return str(path)
+
+
+def read_companies(monkeypatch, path, chunk_size=None):
+    """Companies and metadata of path, read chunk_size characters at a time (default chunks when None)"""
+    with monkeypatch.context() as patch:
+        if chunk_size is not None:
+            patch.setattr(process_data, "_JSONStream",
+                          functools.partial(process_data._JSONStream, chunk_size=chunk_size))
+        metadata = {}
+        companies = list(process_data.iter_raw_companies(path, metadata))
+    return companies, metadata
+
+
+@pytest.mark.parametrize("dump_options", [{}, {"indent": 2}, {"ensure_ascii": False}],
+                         ids=["compact", "indented", "unescaped"])
+def test_every_chunk_boundary(tmp_path, monkeypatch, dump_options):
+    # A top-level number is only complete once the character after it has been read
+    document = {"success": True, "total_companies": 1234567, "companies": COMPANIES,
+                "timestamp": "2025-07-21T21:56:28.169Z"}
+    path = write_document(tmp_path, document, **dump_options)
+    length = len(Path(path).read_text(encoding="utf-8"))
+
+    for chunk_size in range(1, length + 2):
+        companies, metadata = read_companies(monkeypatch, path, chunk_size)
+        assert companies == COMPANIES, chunk_size
+        assert metadata == {"success": True, "total_companies": 1234567,
+                            "timestamp": "2025-07-21T21:56:28.169Z"}, chunk_size
+
+
+def test_metadata_before_and_after_companies(tmp_path):
+    document = {"firm": "Acme Capital", "summary": {"total_companies": 3, "nested": [1, 2]},
+                "companies": COMPANIES, "timestamp": "x", "count": 3}
+    path = write_document(tmp_path, document)
+
+    metadata = {}
+    companies = process_data.iter_raw_companies(path, metadata)
+    assert next(companies) == COMPANIES[0]
+    assert metadata == {"firm": "Acme Capital", "summary": {"total_companies": 3, "nested": [1, 2]}}
+    assert list(companies) == COMPANIES[1:]
+    assert metadata == {"firm": "Acme Capital", "summary": {"total_companies": 3, "nested": [1, 2]},
+                        "timestamp": "x", "count": 3}
+
+
+@pytest.mark.parametrize("document", [
+    {"success": True, "companies": [], "timestamp": "x"},
+    {"companies": []},
+    {"success": False},
+    {}
+], ids=["empty-companies", "only-companies", "no-companies", "empty-object"])
+def test_no_companies(tmp_path, monkeypatch, document):
+    path = write_document(tmp_path, document, indent=1)
+    for chunk_size in (None, 1, 2, 3):
+        companies, metadata = read_companies(monkeypatch, path, chunk_size)
+        assert companies == []
+        assert metadata == {key: value for key, value in document.items() if key != "companies"}
+
+
+def test_truncated_input_raises(tmp_path, monkeypatch):
+    text = json.dumps({"success": True, "companies": COMPANIES[:2], "timestamp": "x", "total": 10})
+    path = tmp_path / "acme_research_results.json"
+    for end in range(len(text)):
+        path.write_text(text[:end], encoding="utf-8")
+        for chunk_size in (None, 7):
+            with pytest.raises(json.JSONDecodeError):
+                read_companies(monkeypatch, str(path), chunk_size)
@@ -0,0 +1,211 @@
+"""
+Self-Funded Classifier Tests
+Checks the projected-column CSV reader, the packed Schedule A index and the
+sponsor name index against a plain csv.DictReader implementation of the same
+lookups, on DOL-style CSVs with quoted, multi-line, short and blank records
+and bare quotes inside unquoted fields
+"""
+
+import csv
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "docs" / "completed"))
+
+import self_funded_classifier as classifier  # noqa: E402
+
+
+DATA_DIR = Path(__file__).resolve().parent / "data" / "classifier"
+HEADERS_FIXTURE = "f_5500_edge_cases.csv"
+SCHEDULE_A_FIXTURE = "F_SCH_A_edge_cases.csv"
+
+QUERIES = [
+    ("acme", False),
+    ("ACME HOLDINGS INC", True),
+    ("acme, llc", False),
+    ('the "acme" group', True),
+    ('"acme', False),
+    ("acme\nmultiline co", True),
+    ("multiline", False),
+    ("acme short", True),
+    ('acme 5" pipe co', True),
+    ('2"', False),
+    ("beta", False),
+    ("Acme Beta Partners", True),
+    ("ácme", False),
+    ("inc.", False),
+    ("no such sponsor", False),
+]
+
+# Keys that are in no fixture row, including near misses of ones that are
+# ("123456789" has the same digit values as the non-ASCII EIN of plan 508)
+PROBE_KEYS = [
+    ("123456789", "501", "2021"),
+    ("12345678", "0501", "2023"),
+    ("012345678", "501", "2023"),
+    ("123456789", "0501", "2023"),
+    ("223456789", "509", "2O23"),
+    ("123456789", "508", "2023"),
+    ("", "", ""),
+]
+
+
+@pytest.fixture
+def csv_paths(tmp_path):
+    """Copies of the fixtures, so the on-disk indexes are written next to them in tmp_path"""
+    headers = tmp_path / HEADERS_FIXTURE
+    schedule_a = tmp_path / SCHEDULE_A_FIXTURE
+    shutil.copyfile(DATA_DIR / HEADERS_FIXTURE, headers)
+    shutil.copyfile(DATA_DIR / SCHEDULE_A_FIXTURE, schedule_a)
+    return str(headers), str(schedule_a)
+
+
+def reference_schedule_a_index(sched_a_path):
+    """Begin-year and end-year flags of every Schedule A row, read with DictReader"""
+    by_begin, by_end = {}, {}
+    with open(sched_a_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            ein = (row.get("SCH_A_EIN") or "").strip()
+            pn = (row.get("SCH_A_PLAN_NUM") or "").strip()
+            begin = (row.get("SCH_A_PLAN_YEAR_BEGIN_DATE") or "").strip()
+            end = (row.get("SCH_A_PLAN_YEAR_END_DATE") or "").strip()
+            if not ein or not pn:
+                continue
+            health = classifier.is_true(row.get("WLFR_BNFT_HEALTH_IND") or "")
+            stop = classifier.is_true(row.get("WLFR_BNFT_STOP_LOSS_IND") or "")
+            for index, date in ((by_begin, begin), (by_end, end)):
+                if len(date) < 4 or not (health or stop):
+                    continue
+                flags = index.setdefault((ein, pn, date[:4]), {"health": False, "stop": False})
+                flags["health"] = flags["health"] or health
+                flags["stop"] = flags["stop"] or stop
+    return by_begin, by_end
+
+
+def reference_company_plans(headers_path, company, sa_begin_idx, sa_end_idx, exact=False, year=None):
+    """find_company_plans over every DictReader row of the headers CSV"""
+    company_q = classifier.norm(company)
+    plans = []
+    with open(headers_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            sponsor = classifier.norm(row.get("SPONSOR_DFE_NAME"))
+            if (sponsor != company_q) if exact else (company_q not in sponsor):
+                continue
+            plan = classifier.evaluate_plan_row(row, sa_begin_idx, sa_end_idx, year)
+            if plan is not None:
+                plans.append(plan)
+    return plans
+
+
+def test_fixture_rows_match_dict_reader(csv_paths):
+    headers_path, sched_a_path = csv_paths
+    for path, fields in ((headers_path, classifier.HEADER_FIELDS), (sched_a_path, classifier.SCHEDULE_A_FIELDS)):
+        reader = classifier.ProjectedCSV(path, fields)
+        with open(path, newline="", encoding="utf-8") as f:
+            expected = [tuple(row.get(name) for name in fields) for row in csv.DictReader(f)]
+        assert list(reader.rows()) == expected
+
+
+@pytest.mark.parametrize("on_disk", [False, True], ids=["in-memory", "on-disk"])
+def test_schedule_a_views_match_dict_reader(csv_paths, on_disk):
+    _, sched_a_path = csv_paths
+    expected_begin, expected_end = reference_schedule_a_index(sched_a_path)
+    if on_disk:
+        begin_view, end_view = classifier.load_schedA_index(sched_a_path)
+        assert Path(sched_a_path + classifier.INDEX_SUFFIX).exists()
+    else:
+        begin_view, end_view = classifier.build_schedA_index(sched_a_path)
+
+    keys = set(expected_begin) | set(expected_end) | set(PROBE_KEYS)
+    for view, expected in ((begin_view, expected_begin), (end_view, expected_end)):
+        assert len(view) == len(expected)
+        for key in keys:
+            assert view.get(key) == expected.get(key), key
+            assert view.get(key, {}) == expected.get(key, {}), key
+
+
+@pytest.mark.parametrize("use_name_index", [False, True], ids=["scan", "name-index"])
+@pytest.mark.parametrize("year", [None, 2022, 2023])
+def test_find_company_plans_matches_dict_reader(csv_paths, use_name_index, year):
+    headers_path, sched_a_path = csv_paths
+    sa_begin_idx, sa_end_idx = classifier.load_schedA_index(sched_a_path)
+    reference_begin, reference_end = reference_schedule_a_index(sched_a_path)
+    name_index = classifier.SponsorNameIndex.open(headers_path) if use_name_index else None
+    try:
+        for company, exact in QUERIES:
+            expected = reference_company_plans(headers_path, company, reference_begin, reference_end, exact, year)
+            found = classifier.find_company_plans(headers_path, company, sa_begin_idx, sa_end_idx, exact=exact,
+                                                  year=year, name_index=name_index)
+            assert found == expected, (company, exact)
+    finally:
+        if name_index is not None:
+            name_index.close()
+
+
+@pytest.mark.parametrize("use_name_index", [False, True], ids=["scan", "name-index"])
+def test_find_portfolio_plans_matches_dict_reader(csv_paths, use_name_index):
+    headers_path, sched_a_path = csv_paths
+    sa_begin_idx, sa_end_idx = classifier.build_schedA_index(sched_a_path)
+    reference_begin, reference_end = reference_schedule_a_index(sched_a_path)
+    name_index = classifier.SponsorNameIndex.open(headers_path) if use_name_index else None
+    try:
+        found = classifier.find_portfolio_plans(headers_path, QUERIES, sa_begin_idx, sa_end_idx,
+                                                name_index=name_index)
+    finally:
+        if name_index is not None:
+            name_index.close()
+
+    expected = [reference_company_plans(headers_path, company, reference_begin, reference_end, exact)
+                for company, exact in QUERIES]
+    assert found == expected
+
+
+def test_fixture_covers_medical_plans(csv_paths):
+    # Guard against a fixture edit that leaves the comparisons above with nothing to compare
+    headers_path, sched_a_path = csv_paths
+    begin_view, end_view = classifier.build_schedA_index(sched_a_path)
+    plans = classifier.find_company_plans(headers_path, "acme", begin_view, end_view)
+    classifications = {plan["classification"] for plan in plans}
+    assert len(plans) >= 10
+    assert {"Insured", "Self-funded w/ stop-loss", "Self-funded"} <= classifications
+
+
+def test_touched_csv_with_read_only_index(csv_paths, monkeypatch):
+    _, sched_a_path = csv_paths
+    expected_begin, _ = reference_schedule_a_index(sched_a_path)
+    classifier.load_schedA_index(sched_a_path)
+    index_path = sched_a_path + classifier.INDEX_SUFFIX
+    stat = Path(sched_a_path).stat()
+    os.utime(sched_a_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def read_only_open(path, mode="r", *args, **kwargs):
+        if str(path) == index_path and mode != "rb":
+            raise PermissionError(13, "Permission denied", path)
+        return open(path, mode, *args, **kwargs)
+
+    # Running as root ignores file modes, so refuse writes to the index directly
+    monkeypatch.setattr(classifier, "open", read_only_open, raising=False)
+    begin_view, _ = classifier.load_schedA_index(sched_a_path)
+    assert len(begin_view) == len(expected_begin)
+    for key, flags in expected_begin.items():
+        assert begin_view.get(key) == flags, key
+
+
+def test_corrupt_index_is_rebuilt(csv_paths):
+    _, sched_a_path = csv_paths
+    expected_begin, _ = reference_schedule_a_index(sched_a_path)
+    classifier.load_schedA_index(sched_a_path)
+    index_path = Path(sched_a_path + classifier.INDEX_SUFFIX)
+    data = bytearray(index_path.read_bytes())
+    data[-1:] = b"!"  # same length, so only the trailing JSON is broken
+    index_path.write_bytes(bytes(data))
+
+    begin_view, _ = classifier.load_schedA_index(sched_a_path)
+    assert len(begin_view) == len(expected_begin)
+    for key, flags in expected_begin.items():
+        assert begin_view.get(key) == flags, key
+    assert index_path.read_bytes() != bytes(data)